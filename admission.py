@@ -0,0 +1,171 @@
+import asyncio
+import json
+import os
+import time
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+API_PREFIX = "/api/v3"
+
+# Сколько секунд запрос может ждать в очереди группы, прежде чем получит 503
+ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "5"))
+ADMISSION_RETRY_AFTER_SECONDS = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "1"))
+
+# Группа -> (одновременных запросов, мест в очереди) по умолчанию.
+# Лимиты задаются на один воркер и должны быть согласованы с DB_POOL_SIZE + DB_MAX_OVERFLOW
+DEFAULT_LIMITS = {
+    "auth": (8, 50),
+    "task_reads": (10, 100),
+    "task_writes": (5, 50),
+    "admin": (2, 10),
+    "bulk_io": (2, 5),
+}
+
+
+class AdmissionGroup:
+    """
+    Ограничение одновременных запросов группы с ограниченной очередью ожидания.
+    Если очередь заполнена или ожидание дольше timeout — запрос отклоняется сразу.
+    limit <= 0 отключает ограничение.
+    """
+
+    def __init__(self, name: str, limit: int, queue_size: int, timeout: float):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(max(limit, 1))
+        self.active = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self.wait_seconds = 0.0
+
+    async def acquire(self) -> bool:
+        if self.limit <= 0:
+            self.admitted += 1
+            self.active += 1
+            return True
+        if self._semaphore.locked():
+            if self.waiting >= self.queue_size:
+                self.rejected_queue_full += 1
+                return False
+            self.waiting += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.timeout)
+            except asyncio.TimeoutError:
+                self.rejected_timeout += 1
+                return False
+            finally:
+                self.waiting -= 1
+                self.wait_seconds += time.perf_counter() - started
+        else:
+            await self._semaphore.acquire()
+        self.admitted += 1
+        self.active += 1
+        return True
+
+    def release(self) -> None:
+        self.active -= 1
+        if self.limit > 0:
+            self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "queue_size": self.queue_size,
+            "active": self.active,
+            "waiting": self.waiting,
+            "max_waiting": self.max_waiting,
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+            "wait_seconds": round(self.wait_seconds, 6),
+        }
+
+
+def _group_from_env(name: str) -> AdmissionGroup:
+    limit, queue_size = DEFAULT_LIMITS[name]
+    prefix = f"ADMISSION_{name.upper()}"
+    return AdmissionGroup(
+        name,
+        int(os.getenv(f"{prefix}_CONCURRENCY", str(limit))),
+        int(os.getenv(f"{prefix}_QUEUE", str(queue_size))),
+        ADMISSION_QUEUE_TIMEOUT_SECONDS
+    )
+
+
+admission_groups: Dict[str, AdmissionGroup] = {name: _group_from_env(name) for name in DEFAULT_LIMITS}
+
+
+def route_group(method: str, path: str) -> Optional[str]:
+    """Группа запроса по пути и методу; None — без ограничения (/, /health, /docs)."""
+    if not path.startswith(API_PREFIX):
+        return None
+    path = path[len(API_PREFIX):]
+    if path.startswith("/auth"):
+        return "auth"
+    if path.startswith("/admin"):
+        return "admin"
+    if path == "/tasks/events":
+        # Долгоживущий поток: своя граница — TASK_EVENTS_MAX_CONNECTIONS
+        return None
+    if path in ("/tasks/export", "/tasks/import"):
+        # Экспорт и импорт держат слот на всю передачу файла — отдельно от коротких запросов
+        return "bulk_io"
+    if path.startswith("/tasks") or path.startswith("/stats"):
+        return "task_reads" if method in ("GET", "HEAD") else "task_writes"
+    return None
+
+
+class AdmissionMiddleware:
+    """
+    ASGI-middleware: пропускает запрос, только если в его группе есть свободный слот,
+    иначе быстро отвечает 503 с Retry-After, не дожидаясь соединения из пула.
+    """
+
+    def __init__(self, app, groups: Optional[Dict[str, AdmissionGroup]] = None):
+        self.app = app
+        self.groups = admission_groups if groups is None else groups
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        name = route_group(scope["method"], scope["path"])
+        group = self.groups.get(name) if name else None
+        if group is None:
+            return await self.app(scope, receive, send)
+
+        if not await group.acquire():
+            return await self._reject(send)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            group.release()
+
+    async def _reject(self, send) -> None:
+        body = json.dumps(
+            {"detail": "Сервер перегружен, повторите запрос позже"},
+            ensure_ascii=False
+        ).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(ADMISSION_RETRY_AFTER_SECONDS).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+def admission_stats() -> dict:
+    return {name: group.stats() for name, group in admission_groups.items()}
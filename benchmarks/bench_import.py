@@ -0,0 +1,93 @@
+"""
+Импорт задач: построчное создание (add + commit + refresh, как POST /tasks/) против
+task_import.import_tasks (валидация пачками, COPY в PostgreSQL / executemany в SQLite).
+Печатает строки в секунду.
+
+    python -m benchmarks.bench_import --rows 100000 --naive-rows 1000
+"""
+import argparse
+import asyncio
+import io
+import json
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.common import Timer, add_allow_drop_argument, create_client
+
+
+def make_ndjson(rows: int) -> bytes:
+    now = datetime.now(timezone.utc)
+    lines = []
+    for i in range(rows):
+        lines.append(json.dumps({
+            "title": f"Импортированная задача {i}",
+            "description": None if i % 3 == 0 else f"Описание задачи {i}",
+            "is_important": i % 2 == 0,
+            "deadline_at": (now + timedelta(hours=i % 500)).isoformat(),
+        }, ensure_ascii=False))
+    # Каждая сотая строка некорректна — проверяем, что отказы не тормозят загрузку
+    for i in range(0, rows, 100):
+        lines[i] = json.dumps({"title": "x", "is_important": True})
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+async def naive(user_id: int, rows: int) -> float:
+    from database import AsyncSessionLocal
+    from models import Task
+    from task_quadrants import calculate_quadrant
+
+    now = datetime.now(timezone.utc)
+    with Timer() as timer:
+        async with AsyncSessionLocal() as db:
+            for i in range(rows):
+                deadline_at = now + timedelta(hours=i % 500)
+                task = Task(
+                    title=f"Задача {i}",
+                    description=f"Описание задачи {i}",
+                    is_important=i % 2 == 0,
+                    deadline_at=deadline_at,
+                    quadrant=calculate_quadrant(i % 2 == 0, deadline_at, now),
+                    completed=False,
+                    user_id=user_id
+                )
+                db.add(task)
+                await db.commit()
+                await db.refresh(task)
+    return rows / timer.elapsed
+
+
+async def bulk(user_id: int, payload: bytes, chunk_size: int) -> tuple:
+    from database import AsyncSessionLocal
+    from task_import import import_tasks
+
+    with Timer() as timer:
+        async with AsyncSessionLocal() as db:
+            report = await import_tasks(db, io.BytesIO(payload), "ndjson", user_id, chunk_size)
+    return report, report.accepted / timer.elapsed
+
+
+async def main(rows: int, naive_rows: int, chunk_size: int, allow_drop: bool = False) -> None:
+    from sqlalchemy import select
+    from benchmarks.common import register_and_login
+    from database import AsyncSessionLocal, engine
+    from models import User
+
+    _, client = await create_client(allow_drop)
+    async with client:
+        await register_and_login(client, "importer")
+    async with AsyncSessionLocal() as db:
+        user_id = await db.scalar(select(User.id).where(User.nickname == "importer"))
+
+    print(f"database: {engine.dialect.name}")
+    print(f"{'row by row':>12}: {await naive(user_id, naive_rows):,.0f} rows/s ({naive_rows} rows)")
+    report, rate = await bulk(user_id, make_ndjson(rows), chunk_size)
+    print(f"{'import':>12}: {rate:,.0f} rows/s ({report.accepted} accepted, {report.rejected} rejected, {report.chunks} chunks)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--naive-rows", type=int, default=1000)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    add_allow_drop_argument(parser)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.naive_rows, args.chunk_size, args.allow_drop))
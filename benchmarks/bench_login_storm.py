@@ -0,0 +1,87 @@
+"""
+Латентность не-auth эндпоинта во время шквала логинов.
+
+Сравнивает bcrypt прямо в event loop (HASH_POOL_SIZE=0) и в пуле потоков:
+при хешировании в event loop p99 GET /api/v3/tasks/{id} растет до времени bcrypt,
+с пулом — остается на уровне обычного запроса.
+
+    python -m benchmarks.bench_login_storm --logins 200 --concurrency 20
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import add_allow_drop_argument, create_client, register_and_login, summarize
+
+
+async def probe(client, headers, task_id, stop: asyncio.Event, latencies: list) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = await client.get(f"/api/v3/tasks/{task_id}", headers=headers)
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(0.005)
+
+
+async def storm(client, logins: int, concurrency: int) -> int:
+    """Возвращает число логинов, отклоненных admission control (503)."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def login() -> bool:
+        async with semaphore:
+            response = await client.post(
+                "/api/v3/auth/login",
+                data={"username": "storm@example.com", "password": "benchpass"}
+            )
+            if response.status_code == 503:
+                return True
+            response.raise_for_status()
+            return False
+
+    return sum(await asyncio.gather(*(login() for _ in range(logins))))
+
+
+async def run_scenario(client, headers, task_id, logins: int, concurrency: int) -> dict:
+    latencies: list = []
+    stop = asyncio.Event()
+    prober = asyncio.create_task(probe(client, headers, task_id, stop, latencies))
+    started = time.perf_counter()
+    shed = await storm(client, logins, concurrency)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await prober
+    result = summarize(latencies)
+    result["logins_per_sec"] = round((logins - shed) / elapsed, 1)
+    result["logins_shed"] = shed
+    return result
+
+
+async def main(logins: int, concurrency: int, pool_size: int, allow_drop: bool = False) -> None:
+    import auth_utils
+
+    _, client = await create_client(allow_drop)
+    async with client:
+        headers = await register_and_login(client, "prober")
+        await register_and_login(client, "storm")
+        response = await client.post(
+            "/api/v3/tasks/",
+            json={"title": "probe", "is_important": True, "deadline_at": "2030-01-01T00:00:00Z"},
+            headers=headers
+        )
+        task_id = response.json()["id"]
+
+        for name, size in (("inline", 0), (f"thread pool x{pool_size}", pool_size)):
+            auth_utils.hashing_pool = auth_utils.HashingPool("thread", size, max(size, 1))
+            result = await run_scenario(client, headers, task_id, logins, concurrency)
+            auth_utils.hashing_pool.shutdown()
+            print(f"{name:>16}: {result}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--pool-size", type=int, default=4)
+    add_allow_drop_argument(parser)
+    args = parser.parse_args()
+    asyncio.run(main(args.logins, args.concurrency, args.pool_size, args.allow_drop))
@@ -0,0 +1,87 @@
+"""
+Сериализация списков задач: прежний путь (ORM-объекты -> TaskPage с from_attributes ->
+стандартный JSONResponse) против быстрого (Core-строки -> dict -> orjson).
+Проверяет, что ответы совпадают побайтно, и печатает время на 1k/10k/100k строк.
+
+    python -m benchmarks.bench_serialization --sizes 1000 10000 100000
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.common import add_allow_drop_argument, create_client
+
+
+async def seed(count: int) -> None:
+    from sqlalchemy import insert, delete
+    from database import AsyncSessionLocal
+    from models import Task
+
+    now = datetime.now(timezone.utc)
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(Task))
+        await db.execute(insert(Task), [
+            {
+                "title": f"Задача номер {i}",
+                "description": None if i % 3 == 0 else f"Описание задачи {i} с \"кавычками\"",
+                "is_important": i % 2 == 0,
+                "deadline_at": now + timedelta(hours=i % 500),
+                "quadrant": "Q1",
+                "completed": i % 5 == 0,
+                "user_id": None,
+            }
+            for i in range(count)
+        ])
+        await db.commit()
+
+
+async def old_path(db) -> tuple:
+    from fastapi.responses import JSONResponse
+    from sqlalchemy import select
+    from models import Task
+    from schemas import TaskPage
+
+    started = time.perf_counter()
+    tasks = (await db.execute(select(Task).order_by(Task.id))).scalars().all()
+    fetched = time.perf_counter()
+    page = TaskPage.model_validate({"items": tasks, "next_cursor": None}, from_attributes=True)
+    body = JSONResponse(page.model_dump(mode="json")).body
+    return fetched - started, time.perf_counter() - fetched, body
+
+
+async def fast_path(db) -> tuple:
+    from sqlalchemy import select
+    from models import Task
+    from serialization import TASK_RESPONSE_COLUMNS, task_page_response
+
+    started = time.perf_counter()
+    rows = (await db.execute(select(*TASK_RESPONSE_COLUMNS).order_by(Task.id))).all()
+    fetched = time.perf_counter()
+    body = task_page_response({"items": rows, "next_cursor": None}).body
+    return fetched - started, time.perf_counter() - fetched, body
+
+
+async def main(sizes: list, allow_drop: bool = False) -> None:
+    from database import AsyncSessionLocal
+
+    _, client = await create_client(allow_drop)
+    await client.aclose()
+    print(f"{'rows':>8} {'path':>5} {'fetch ms':>10} {'serialize ms':>13} {'total ms':>10}")
+    for size in sizes:
+        await seed(size)
+        bodies = {}
+        for name, path in (("old", old_path), ("fast", fast_path)):
+            async with AsyncSessionLocal() as db:
+                fetch, serialize, body = await path(db)
+            bodies[name] = body
+            print(f"{size:>8} {name:>5} {fetch * 1000:>10.1f} {serialize * 1000:>13.1f} {(fetch + serialize) * 1000:>10.1f}")
+        print(f"{'':>8} identical bytes: {bodies['old'] == bodies['fast']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    add_allow_drop_argument(parser)
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes, args.allow_drop))
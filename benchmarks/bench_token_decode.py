@@ -0,0 +1,37 @@
+"""
+Микробенчмарк проверки JWT: decode_access_token с кешем проверенных токенов и без него.
+
+    python -m benchmarks.bench_token_decode --iterations 20000
+"""
+import argparse
+import timeit
+
+import benchmarks.common  # noqa: F401  (настраивает окружение)
+import auth_utils
+from cache import TTLCache
+
+
+def main(iterations: int) -> None:
+    token = auth_utils.create_access_token({"sub": "1", "role": "user"})
+    original = auth_utils.token_cache
+
+    results = {}
+    for name, cache in (
+        ("without cache", TTLCache(maxsize=0, ttl=0)),
+        ("with cache", TTLCache(maxsize=1000, ttl=300)),
+    ):
+        auth_utils.token_cache = cache
+        auth_utils.decode_access_token(token)
+        seconds = timeit.timeit(lambda: auth_utils.decode_access_token(token), number=iterations)
+        results[name] = seconds / iterations * 1e6
+        print(f"{name:>14}: {results[name]:.2f} us/request")
+
+    auth_utils.token_cache = original
+    print(f"{'speedup':>14}: x{results['without cache'] / results['with cache']:.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+    main(args.iterations)
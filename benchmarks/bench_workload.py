@@ -0,0 +1,317 @@
+"""
+Смешанная нагрузка на все роутеры (tasks, stats, auth, admin) с отчетом по эндпоинтам
+и сравнением с сохраненным baseline.
+
+    python -m benchmarks.bench_workload --users 20 --tasks-per-user 500 --requests 3000 --concurrency 16
+    python -m benchmarks.bench_workload --save-baseline      # записать текущие результаты как baseline
+    python -m benchmarks.bench_workload --tolerance 0.3      # код выхода 1 при регрессии больше 30%
+
+Нагрузка воспроизводима (--seed): данные и распределение запросов одинаковы от запуска к запуску.
+Baseline зависит от машины и СУБД, сравнивать имеет смысл только результаты с одного стенда.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.common import Timer, add_allow_drop_argument, create_client, seed_users_and_tasks, summarize
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baselines", "workload.json")
+# Разница p95 меньше этой величины считается шумом, даже если в процентах она большая
+MIN_REGRESSION_MS = 2.0
+# Эндпоинты с малым числом запросов сравниваются только в составе TOTAL
+MIN_SAMPLES = 50
+
+
+class Workload:
+    """
+    Операции нагрузки с весами. Каждая возвращает (имя эндпоинта, корутину запроса):
+    подготовка (например, выбор id задачи) не входит в измеряемое время.
+    """
+
+    def __init__(self, client, users: list, rng: random.Random):
+        self.client = client
+        self.admin = users[0]
+        self.users = users[1:] or users
+        self.rng = rng
+        self.etags = {}
+        self.operations = [
+            (30, self.list_tasks),
+            (10, self.list_tasks_conditional),
+            (5, self.next_page),
+            (8, self.by_quadrant),
+            (6, self.by_status),
+            (4, self.due_today),
+            (4, self.search),
+            (10, self.get_task),
+            (8, self.stats),
+            (3, self.deadlines),
+            (5, self.me),
+            (5, self.create_task),
+            (4, self.update_task),
+            (3, self.complete_task),
+            (2, self.delete_task),
+            (1, self.bulk_create),
+            (1, self.login),
+            (2, self.admin_users),
+        ]
+        self.weights = [w for w, _ in self.operations]
+
+    def pick(self):
+        return self.rng.choices(self.operations, weights=self.weights)[0][1]
+
+    def user(self) -> dict:
+        return self.rng.choice(self.users)
+
+    def task_payload(self) -> dict:
+        deadline = datetime.now(timezone.utc) + timedelta(hours=self.rng.randint(1, 24 * 14))
+        return {
+            "title": f"Нагрузочная задача {self.rng.randint(0, 10 ** 6)}",
+            "description": "создана bench_workload",
+            "is_important": self.rng.random() < 0.5,
+            "deadline_at": deadline.isoformat(),
+        }
+
+    async def some_task_id(self, user: dict):
+        response = await self.client.get("/api/v3/tasks", params={"limit": 20}, headers=user["headers"])
+        items = response.json().get("items", []) if response.status_code == 200 else []
+        return self.rng.choice(items)["id"] if items else None
+
+    async def list_tasks(self):
+        return "GET /tasks", self.client.get("/api/v3/tasks", headers=self.user()["headers"])
+
+    async def list_tasks_conditional(self):
+        user = self.user()
+        headers = dict(user["headers"])
+        if user["id"] in self.etags:
+            headers["If-None-Match"] = self.etags[user["id"]]
+
+        async def request():
+            response = await self.client.get("/api/v3/tasks", headers=headers)
+            if "etag" in response.headers:
+                self.etags[user["id"]] = response.headers["etag"]
+            return response
+
+        return "GET /tasks (If-None-Match)", request()
+
+    async def next_page(self):
+        user = self.user()
+        first = await self.client.get("/api/v3/tasks", params={"limit": 20}, headers=user["headers"])
+        cursor = first.json().get("next_cursor") if first.status_code == 200 else None
+        params = {"limit": 20, "cursor": cursor} if cursor else {"limit": 20}
+        return "GET /tasks?cursor", self.client.get("/api/v3/tasks", params=params, headers=user["headers"])
+
+    async def by_quadrant(self):
+        quadrant = self.rng.choice(["Q1", "Q2", "Q3", "Q4"])
+        return "GET /tasks/quadrant/{q}", self.client.get(
+            f"/api/v3/tasks/quadrant/{quadrant}", headers=self.user()["headers"]
+        )
+
+    async def by_status(self):
+        status = self.rng.choice(["completed", "pending"])
+        return "GET /tasks/status/{s}", self.client.get(
+            f"/api/v3/tasks/status/{status}", headers=self.user()["headers"]
+        )
+
+    async def due_today(self):
+        return "GET /tasks/today", self.client.get("/api/v3/tasks/today", headers=self.user()["headers"])
+
+    async def search(self):
+        q = self.rng.choice(["отчет", "встреча", "ревью", "релиз", "Задача 1"])
+        return "GET /tasks/search", self.client.get(
+            "/api/v3/tasks/search", params={"q": q}, headers=self.user()["headers"]
+        )
+
+    async def get_task(self):
+        user = self.user()
+        task_id = await self.some_task_id(user) or 0
+        return "GET /tasks/{id}", self.client.get(f"/api/v3/tasks/{task_id}", headers=user["headers"])
+
+    async def stats(self):
+        return "GET /stats/", self.client.get("/api/v3/stats/", headers=self.user()["headers"])
+
+    async def deadlines(self):
+        return "GET /stats/deadlines", self.client.get(
+            "/api/v3/stats/deadlines", params={"within_days": 7}, headers=self.user()["headers"]
+        )
+
+    async def me(self):
+        return "GET /auth/me", self.client.get("/api/v3/auth/me", headers=self.user()["headers"])
+
+    async def create_task(self):
+        return "POST /tasks/", self.client.post(
+            "/api/v3/tasks/", json=self.task_payload(), headers=self.user()["headers"]
+        )
+
+    async def update_task(self):
+        user = self.user()
+        task_id = await self.some_task_id(user) or 0
+        return "PUT /tasks/{id}", self.client.put(
+            f"/api/v3/tasks/{task_id}",
+            json={"title": f"Обновлено {self.rng.randint(0, 10 ** 6)}", "is_important": self.rng.random() < 0.5},
+            headers=user["headers"]
+        )
+
+    async def complete_task(self):
+        user = self.user()
+        task_id = await self.some_task_id(user) or 0
+        return "PATCH /tasks/{id}/complete", self.client.patch(
+            f"/api/v3/tasks/{task_id}/complete", headers=user["headers"]
+        )
+
+    async def delete_task(self):
+        user = self.user()
+        task_id = await self.some_task_id(user) or 0
+        return "DELETE /tasks/{id}", self.client.delete(f"/api/v3/tasks/{task_id}", headers=user["headers"])
+
+    async def bulk_create(self):
+        return "POST /tasks/bulk", self.client.post(
+            "/api/v3/tasks/bulk", json=[self.task_payload() for _ in range(50)], headers=self.user()["headers"]
+        )
+
+    async def login(self):
+        return "POST /auth/login", self.client.post(
+            "/api/v3/auth/login", data={"username": self.user()["email"], "password": "benchpass"}
+        )
+
+    async def admin_users(self):
+        sort = self.rng.choice(["id", "tasks_count"])
+        return "GET /admin/users", self.client.get(
+            "/api/v3/admin/users", params={"sort": sort, "order": "desc"}, headers=self.admin["headers"]
+        )
+
+
+async def run_workload(workload: Workload, requests: int, concurrency: int) -> tuple:
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    shed = defaultdict(int)
+    remaining = requests
+
+    async def worker() -> None:
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            operation = workload.pick()
+            name, request = await operation()
+            started = time.perf_counter()
+            response = await request
+            elapsed = time.perf_counter() - started
+            if response.status_code == 503:
+                shed[name] += 1
+            elif response.status_code >= 500:
+                errors[name] += 1
+            latencies[name].append(elapsed)
+
+    with Timer() as timer:
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, shed, timer.elapsed
+
+
+def build_report(config: dict, latencies: dict, errors: dict, shed: dict, elapsed: float) -> dict:
+    endpoints = {}
+    for name in sorted(latencies):
+        summary = summarize(latencies[name], elapsed)
+        summary["errors"] = errors.get(name, 0)
+        summary["shed"] = shed.get(name, 0)
+        endpoints[name] = summary
+    overall = summarize([v for values in latencies.values() for v in values], elapsed)
+    overall["errors"] = sum(errors.values())
+    overall["shed"] = sum(shed.values())
+    return {"config": config, "overall": overall, "endpoints": endpoints}
+
+
+def print_report(report: dict) -> None:
+    print(f"{'endpoint':<30} {'count':>6} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'err':>4} {'503':>4}")
+    rows = list(report["endpoints"].items()) + [("TOTAL", report["overall"])]
+    for name, s in rows:
+        print(
+            f"{name:<30} {s['count']:>6} {s.get('rps', 0):>8} {s['p50_ms']:>9} "
+            f"{s['p95_ms']:>9} {s['p99_ms']:>9} {s['errors']:>4} {s['shed']:>4}"
+        )
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list:
+    """Список регрессий относительно baseline; пустой — регрессий нет."""
+    regressions = []
+    old, new = baseline["overall"], report["overall"]
+    if new.get("rps", 0) < old.get("rps", 0) * (1 - tolerance):
+        regressions.append(f"TOTAL: rps {new['rps']} < {old['rps']} (-{tolerance:.0%})")
+    if new["errors"] > old["errors"]:
+        regressions.append(f"TOTAL: ошибок {new['errors']} > {old['errors']}")
+    for name, old_summary in baseline["endpoints"].items():
+        new_summary = report["endpoints"].get(name)
+        if new_summary is None or min(new_summary["count"], old_summary["count"]) < MIN_SAMPLES:
+            continue
+        # Хвост латентности шумит, поэтому регрессией считается сдвиг и медианы, и p95
+        worse = [
+            key for key in ("p50_ms", "p95_ms")
+            if new_summary[key] > old_summary[key] * (1 + tolerance)
+            and new_summary[key] - old_summary[key] > MIN_REGRESSION_MS
+        ]
+        if len(worse) == 2:
+            regressions.append(
+                f"{name}: p50 {new_summary['p50_ms']} мс (было {old_summary['p50_ms']}), "
+                f"p95 {new_summary['p95_ms']} мс (было {old_summary['p95_ms']}), допуск +{tolerance:.0%}"
+            )
+    return regressions
+
+
+async def main(args) -> int:
+    config = {
+        "users": args.users,
+        "tasks_per_user": args.tasks_per_user,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "seed": args.seed,
+    }
+    _, client = await create_client(args.allow_drop)
+    async with client:
+        users = await seed_users_and_tasks(args.users, args.tasks_per_user, args.seed)
+        workload = Workload(client, users, random.Random(args.seed))
+        # Прогрев: соединения пула, кеши пользователей и токенов
+        await run_workload(workload, min(200, args.requests), args.concurrency)
+        latencies, errors, shed, elapsed = await run_workload(workload, args.requests, args.concurrency)
+
+    report = build_report(config, latencies, errors, shed, elapsed)
+    print_report(report)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Baseline сохранен: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"Baseline {args.baseline} не найден, сравнение пропущено")
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline["config"] != config:
+        print(f"Параметры отличаются от baseline {baseline['config']}, сравнение пропущено")
+        return 0
+    regressions = compare(report, baseline, args.tolerance)
+    for line in regressions:
+        print(f"РЕГРЕССИЯ {line}")
+    if not regressions:
+        print("Регрессий относительно baseline нет")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--tasks-per-user", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.3, help="допустимое ухудшение p50/p95 и rps (доля)")
+    parser.add_argument("--save-baseline", action="store_true")
+    add_allow_drop_argument(parser)
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,188 @@
+"""
+Общая обвязка бенчмарков: приложение поднимается в процессе поверх локальной
+SQLite (aiosqlite), запросы идут через httpx.ASGITransport — без сети и Supabase.
+Запускать из корня проекта: python -m benchmarks.<имя>
+"""
+import os
+import statistics
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+BENCH_DB_PATH = os.path.join(tempfile.gettempdir(), "todo_api_bench.sqlite")
+# Бенчмарки пересоздают схему, поэтому берут только свою базу — BENCH_DATABASE_URL,
+# а DATABASE_URL из окружения или .env (рабочая база) игнорируется
+BENCH_DATABASE_URL = os.getenv("BENCH_DATABASE_URL") or f"sqlite+aiosqlite:///{BENCH_DB_PATH}"
+os.environ["DATABASE_URL"] = BENCH_DATABASE_URL
+# Пустые значения не дают .env подставить реплику и отдельный URL для LISTEN рабочей базы
+os.environ["DATABASE_REPLICA_URL"] = ""
+os.environ["DATABASE_LISTEN_URL"] = ""
+# Лог медленных запросов на SQLite под нагрузкой только мешает читать отчет
+os.environ.setdefault("SLOW_QUERY_THRESHOLD_MS", "0")
+
+import httpx  # noqa: E402
+from sqlalchemy.engine import make_url  # noqa: E402
+
+
+LOCAL_HOSTS = ("localhost", "127.0.0.1", "::1")
+
+
+def add_allow_drop_argument(parser) -> None:
+    parser.add_argument(
+        "--allow-drop",
+        action="store_true",
+        help="разрешить пересоздать схему в BENCH_DATABASE_URL не на localhost"
+    )
+
+
+def _check_droppable(allow_drop: bool) -> None:
+    # Удалять все таблицы можно без подтверждения только в SQLite и локальном PostgreSQL
+    url = make_url(BENCH_DATABASE_URL)
+    if allow_drop or url.get_backend_name() == "sqlite" or (url.host or "localhost") in LOCAL_HOSTS:
+        return
+    raise SystemExit(
+        f"BENCH_DATABASE_URL указывает на {url.host}: бенчмарк удалит все таблицы этой базы. "
+        "Запустите с --allow-drop, если это действительно тестовая база"
+    )
+
+
+async def create_client(allow_drop: bool = False):
+    """Пересоздает схему и возвращает (app, httpx.AsyncClient)."""
+    _check_droppable(allow_drop)
+    import main
+    from database import init_db, drop_db, engine
+
+    if engine.dialect.name == "sqlite":
+        _tune_sqlite(engine)
+    await drop_db()
+    await init_db()
+    transport = httpx.ASGITransport(app=main.app)
+    client = httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None)
+    return main.app, client
+
+
+def _tune_sqlite(engine) -> None:
+    """
+    SQLite — однописательная СУБД: в режиме WAL читатели не блокируют запись,
+    а busy_timeout дает писателям дождаться своей очереди под нагрузкой.
+    """
+    from sqlalchemy import event
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA busy_timeout=30000")
+        cursor.close()
+
+
+async def register_and_login(client: httpx.AsyncClient, nickname: str, password: str = "benchpass") -> Dict[str, str]:
+    email = f"{nickname}@example.com"
+    response = await client.post(
+        "/api/v3/auth/register",
+        json={"nickname": nickname, "email": email, "password": password}
+    )
+    response.raise_for_status()
+    response = await client.post(
+        "/api/v3/auth/login",
+        data={"username": email, "password": password}
+    )
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies: List[float], elapsed: Optional[float] = None) -> dict:
+    """Латентности в секундах -> сводка в миллисекундах."""
+    summary = {
+        "count": len(latencies),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+    }
+    if elapsed:
+        summary["rps"] = round(len(latencies) / elapsed, 1)
+    return summary
+
+
+class Timer:
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.started
+
+
+async def seed_users_and_tasks(users: int, tasks_per_user: int, seed: int = 0, password: str = "benchpass") -> List[dict]:
+    """
+    Быстрое наполнение базы в обход API: пользователи (первый — ADMIN) с одним общим хешем пароля
+    и задачи пачками. Возвращает [{"id", "email", "headers"}], токены выпускаются без логина.
+    """
+    import random
+    from datetime import datetime, timedelta, timezone
+
+    from sqlalchemy import insert, select
+    from auth_utils import create_access_token, get_password_hash
+    from database import AsyncSessionLocal
+    from jobs import task_count_reconciler
+    from models import Task, User, UserRole
+    from task_changes import TASK_COUNTERS_ENABLED, rebuild_task_counters
+    from task_quadrants import calculate_quadrant
+
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    hashed_password = get_password_hash(password)
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(User), [
+            {
+                "nickname": f"user{i}",
+                "email": f"user{i}@example.com",
+                "hashed_password": hashed_password,
+                "role": UserRole.ADMIN if i == 0 else UserRole.USER,
+            }
+            for i in range(users)
+        ])
+        rows = (await db.execute(select(User.id, User.email, User.role).order_by(User.id))).all()
+        batch = []
+        for row in rows:
+            for i in range(tasks_per_user):
+                is_important = rng.random() < 0.5
+                deadline_at = now + timedelta(hours=rng.randint(-48, 24 * 30))
+                batch.append({
+                    "title": f"Задача {i} пользователя {row.id}",
+                    "description": None if i % 4 == 0 else f"Описание {rng.choice(['отчет', 'встреча', 'ревью', 'релиз'])} {i}",
+                    "is_important": is_important,
+                    "deadline_at": deadline_at,
+                    "quadrant": calculate_quadrant(is_important, deadline_at, now),
+                    "completed": rng.random() < 0.3,
+                    "user_id": row.id,
+                })
+                if len(batch) >= 5000:
+                    await db.execute(insert(Task), batch)
+                    batch = []
+        if batch:
+            await db.execute(insert(Task), batch)
+        await db.commit()
+        if TASK_COUNTERS_ENABLED:
+            await rebuild_task_counters(db)
+    # users.tasks_count заполняет сверка, как и в рабочей базе
+    await task_count_reconciler.run_once()
+
+    return [
+        {
+            "id": row.id,
+            "email": row.email,
+            "headers": {"Authorization": "Bearer " + create_access_token({"sub": str(row.id), "role": row.role.value})},
+        }
+        for row in rows
+    ]
@@ -1,7 +1,12 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy import exc
 from typing import AsyncGenerator
+from uuid import uuid4
 import os
+import time
 from dotenv import load_dotenv
 
 try:
@@ -12,11 +17,89 @@ except ImportError:
 
 load_dotenv()
 DATABASE_URL = os.getenv("DATABASE_URL")
+# Необязательная реплика только для чтения (GET /tasks*, /stats/*)
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL") or None
+# Соединение LISTEN для уведомлений между воркерами: напрямую к PostgreSQL или через pooler
+# в session mode — в transaction mode (pgbouncer, Supavisor :6543) уведомления не доставляются
+DATABASE_LISTEN_URL = os.getenv("DATABASE_LISTEN_URL") or DATABASE_URL
+
+# Настройки пула соединений (на один воркер)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "-1"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "false").lower() in ("1", "true", "yes")
+
+# Подготовленные выражения asyncpg:
+#   off       — кеш выключен (безопасно для pgbouncer/Supavisor в transaction mode);
+#   pgbouncer — кеш включен, имена выражений уникальны (pgbouncer >= 1.21 с max_prepared_statements);
+#   on        — обычный кеш asyncpg (прямое подключение или pgbouncer в session mode)
+DB_PREPARED_STATEMENTS = os.getenv("DB_PREPARED_STATEMENTS", "off")
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+
+
+def build_connect_args(mode: str, url: str = DATABASE_URL) -> dict:
+    # Параметры asyncpg; другие драйверы (например, aiosqlite для бенчмарков) их не принимают
+    if make_url(url).get_driver_name() != "asyncpg":
+        return {}
+    if mode == "on":
+        return {"statement_cache_size": DB_STATEMENT_CACHE_SIZE}
+    if mode == "pgbouncer":
+        return {
+            "statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        }
+    return {"statement_cache_size": 0}
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Пул, который считает выдачи соединений, ожидания свободного соединения и таймауты."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.timeouts = 0
+        self._getting = 0
+
+    def _do_get(self):
+        self.checkouts += 1
+        # Ждать придется, если желающих больше, чем свободных соединений и запаса overflow
+        available = self.checkedin()
+        if self._max_overflow < 0:
+            available += self._getting + 1
+        else:
+            available += max(0, self._max_overflow - self.overflow())
+        waiting = self._getting >= available
+        self._getting += 1
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            self._getting -= 1
+            if waiting:
+                self.waits += 1
+                self.wait_seconds += time.perf_counter() - started
 
-engine = create_async_engine(
-    DATABASE_URL,
-    connect_args={"statement_cache_size": 0}
-)
+
+def create_engine_for(url: str):
+    return create_async_engine(
+        url,
+        poolclass=InstrumentedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        connect_args=build_connect_args(DB_PREPARED_STATEMENTS, url)
+    )
+
+
+engine = create_engine_for(DATABASE_URL)
 
 AsyncSessionLocal = async_sessionmaker(
     bind=engine,
@@ -24,16 +107,46 @@ AsyncSessionLocal = async_sessionmaker(
     expire_on_commit=False
 )
 
+# Без реплики чтения идут в основную БД
+replica_engine = create_engine_for(DATABASE_REPLICA_URL) if DATABASE_REPLICA_URL else None
+
+ReplicaSessionLocal = async_sessionmaker(
+    bind=replica_engine,
+    autoflush=False,
+    expire_on_commit=False
+) if replica_engine is not None else None
+
 async def init_db():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-    print("База данных инициализирована!")
+    # Схема создается и обновляется версионированными миграциями (migrations.py)
+    from migrations import migrate
+    version = await migrate()
+    print(f"База данных инициализирована (версия схемы {version})!")
 
 async def drop_db():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
     print("Все таблицы удалены!")
 
+def pool_stats(pool=None) -> dict:
+    pool = pool or engine.pool
+    stats = {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "max_overflow": DB_MAX_OVERFLOW,
+        "timeout_seconds": DB_POOL_TIMEOUT,
+        "prepared_statements": DB_PREPARED_STATEMENTS,
+    }
+    if isinstance(pool, InstrumentedQueuePool):
+        stats.update({
+            "checkouts": pool.checkouts,
+            "waits": pool.waits,
+            "wait_seconds": round(pool.wait_seconds, 6),
+            "timeouts": pool.timeouts,
+        })
+    return stats
+
 async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
     async with AsyncSessionLocal() as session:
         yield session
@@ -5,7 +5,9 @@ from sqlalchemy import select
 from database import get_async_session
 from models import User, UserRole
 from auth_utils import decode_access_token
-from typing import Optional
+from user_cache import get_cached_user, cache_user
+from typing import Optional, AsyncGenerator
+from read_routing import open_read_session
 
 
 # OAuth2 схема для получения токена из заголовка Authorization
@@ -31,14 +33,21 @@ async def get_current_user(
     if user_id is None:
         raise credentials_exception
 
-    result = await db.execute(
-        select(User).where(User.id == int(user_id))
-    )
-    user = result.scalar_one_or_none()
-    if user is None:
-        raise credentials_exception
+    # Данные пользователя берем из кеша; в БД идем только при промахе
+    cached = get_cached_user(int(user_id))
+    if cached is None:
+        result = await db.execute(
+            select(User.id, User.nickname, User.email, User.role)
+            .where(User.id == int(user_id))
+        )
+        row = result.one_or_none()
+        if row is None:
+            raise credentials_exception
+        cached = row._asdict()
+        cache_user(cached)
 
-    return user
+    # Отсоединенный от сессии объект: только идентификатор, контакты и роль
+    return User(**cached)
 
 
 # Авторизация, возвращает объект User, если пользователь является администратором
@@ -53,3 +62,11 @@ async def get_current_admin(
     return current_user
 
 
+# Сессия для GET-эндпоинтов: реплика (если настроена) с учетом read-your-writes
+async def get_read_session(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session)
+) -> AsyncGenerator[AsyncSession, None]:
+    # db — та же сессия, что у get_current_user (зависимость кешируется в рамках запроса)
+    async for session in open_read_session(current_user, db):
+        yield session
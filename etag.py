@@ -0,0 +1,67 @@
+import os
+import time
+from typing import Optional
+
+from dotenv import load_dotenv
+from fastapi import Depends, HTTPException, Request, status
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from dependencies import get_current_user, get_read_session
+from models import TaskVersion, User, UserRole
+
+load_dotenv()
+
+# days_left в ответах зависит от текущего времени, поэтому ETag меняется не реже,
+# чем раз в ETAG_TIME_BUCKET_SECONDS, даже если задачи не менялись
+ETAG_TIME_BUCKET_SECONDS = int(os.getenv("ETAG_TIME_BUCKET_SECONDS", "60"))
+
+
+async def tasks_etag(db: AsyncSession, user: User) -> str:
+    """
+    Слабый ETag набора задач: версия из task_versions (USER) или сводка по всем
+    версиям (ADMIN) плюс номер временного интервала. Таблицу tasks не читает.
+    """
+    if user.role == UserRole.ADMIN:
+        row = (await db.execute(
+            select(func.count(), func.coalesce(func.sum(TaskVersion.version), 0))
+        )).one()
+        scope = f"all.{row[0]}.{row[1]}"
+    else:
+        version = await db.scalar(
+            select(TaskVersion.version).where(TaskVersion.user_id == user.id)
+        )
+        scope = f"u{user.id}.{version or 0}"
+    if ETAG_TIME_BUCKET_SECONDS > 0:
+        scope += f".{int(time.time() // ETAG_TIME_BUCKET_SECONDS)}"
+    return f'W/"{scope}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    # Для GET сравнение слабое: префикс W/ не учитывается
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    bare = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == bare for tag in if_none_match.split(","))
+
+
+def etag_headers(etag: str) -> dict:
+    # private — ответ зависит от пользователя; no-cache — клиент обязан перепроверять ETag
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+
+async def check_tasks_etag(
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_session)
+) -> str:
+    """
+    Зависимость для GET задач и статистики: при совпадении If-None-Match сразу отвечает 304.
+    Версия читается до основного запроса, поэтому ETag никогда не новее отданных данных.
+    """
+    etag = await tasks_etag(db, current_user)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=etag_headers(etag))
+    return etag
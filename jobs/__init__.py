@@ -0,0 +1,17 @@
+from .common import PeriodicJob
+from .quadrants import QuadrantRefresher, quadrant_refresher
+from .task_counts import TaskCountReconciler, task_count_reconciler
+from .replica import ReplicaMonitor, replica_monitor
+from .tombstones import TombstoneCompactor, tombstone_compactor
+
+__all__ = [
+    "PeriodicJob",
+    "QuadrantRefresher",
+    "quadrant_refresher",
+    "TaskCountReconciler",
+    "task_count_reconciler",
+    "ReplicaMonitor",
+    "replica_monitor",
+    "TombstoneCompactor",
+    "tombstone_compactor",
+]
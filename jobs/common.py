@@ -0,0 +1,86 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+
+async def try_job_lock(db: AsyncSession, key: int) -> bool:
+    """
+    Транзакционная advisory-блокировка PostgreSQL: если пачку уже обрабатывает
+    другой воркер, этот ее пропускает. Для других СУБД всегда True.
+    """
+    if db.bind.dialect.name != "postgresql":
+        return True
+    result = await db.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": key})
+    return bool(result.scalar())
+
+
+class PeriodicJob:
+    """Фоновая задача, которая раз в interval секунд вызывает run_once() и копит метрики."""
+
+    name = "job"
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.errors = 0
+        self.last_run_at: Optional[float] = None
+        self.last_duration_seconds = 0.0
+        self.last_rows = 0
+        self.total_rows = 0
+
+    async def run_once(self) -> int:
+        """Один проход; возвращает число затронутых строк."""
+        raise NotImplementedError
+
+    async def run(self) -> int:
+        started = time.perf_counter()
+        self.last_run_at = time.time()
+        try:
+            rows = await self.run_once()
+        except Exception:
+            self.errors += 1
+            logger.exception("Фоновая задача %s завершилась с ошибкой", self.name)
+            rows = 0
+        self.runs += 1
+        self.last_duration_seconds = time.perf_counter() - started
+        self.last_rows = rows
+        self.total_rows += rows
+        return rows
+
+    async def _loop(self) -> None:
+        while True:
+            await self.run()
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "interval_seconds": self.interval,
+            "running": self._task is not None,
+            "runs": self.runs,
+            "errors": self.errors,
+            "last_run_at": self.last_run_at,
+            "last_duration_seconds": round(self.last_duration_seconds, 6),
+            "last_rows": self.last_rows,
+            "total_rows": self.total_rows,
+        }
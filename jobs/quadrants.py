@@ -0,0 +1,78 @@
+import os
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+from sqlalchemy import select, update
+
+from database import AsyncSessionLocal
+from models import Task
+from task_changes import TaskChangeSet
+from task_quadrants import URGENCY_WINDOW
+from .common import PeriodicJob, try_job_lock
+
+load_dotenv()
+
+QUADRANT_REFRESH_INTERVAL_SECONDS = float(os.getenv("QUADRANT_REFRESH_INTERVAL_SECONDS", "300"))
+QUADRANT_REFRESH_BATCH_SIZE = int(os.getenv("QUADRANT_REFRESH_BATCH_SIZE", "1000"))
+
+# Со временем задача может стать только срочнее: Q2 -> Q1, Q4 -> Q3
+PROMOTIONS = {"Q2": "Q1", "Q4": "Q3"}
+
+
+class QuadrantRefresher(PeriodicJob):
+    """
+    Переводит задачи, дедлайн которых вошел в окно срочности, в срочные квадранты.
+    Кандидаты ищутся по индексу (quadrant, deadline_at), обновление — пачками.
+    """
+
+    name = "quadrant_refresh"
+    lock_key = 0x51554144  # "QUAD"
+
+    def __init__(self, interval: float, batch_size: int):
+        super().__init__(interval)
+        self.batch_size = batch_size
+
+    async def run_once(self) -> int:
+        boundary = datetime.now(timezone.utc) + URGENCY_WINDOW
+        touched = 0
+        for old, new in PROMOTIONS.items():
+            while True:
+                rows = await self._promote_batch(old, new, boundary)
+                if rows is None:
+                    return touched
+                touched += rows
+                if rows < self.batch_size:
+                    break
+        return touched
+
+    async def _promote_batch(self, old: str, new: str, boundary: datetime):
+        async with AsyncSessionLocal() as db:
+            if not await try_job_lock(db, self.lock_key):
+                return None
+            batch = (
+                select(Task.id)
+                .where(Task.quadrant == old, Task.deadline_at <= boundary)
+                .limit(self.batch_size)
+                .scalar_subquery()
+            )
+            result = await db.execute(
+                update(Task)
+                .where(Task.id.in_(batch), Task.quadrant == old)
+                .values(quadrant=new)
+                .returning(Task)
+                .execution_options(synchronize_session=False)
+            )
+            rows = result.scalars().all()
+            changes = TaskChangeSet()
+            for task in rows:
+                changes.changed(task.user_id, old, task.completed, new, task.completed)
+                changes.event("updated", task.user_id, task.id, task)
+            await changes.apply(db)
+            await db.commit()
+            return len(rows)
+
+
+quadrant_refresher = QuadrantRefresher(
+    QUADRANT_REFRESH_INTERVAL_SECONDS,
+    QUADRANT_REFRESH_BATCH_SIZE
+)
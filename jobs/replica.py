@@ -0,0 +1,49 @@
+import os
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+from database import ReplicaSessionLocal
+from read_routing import replica_health, REPLICA_MAX_LAG_SECONDS
+from .common import PeriodicJob
+
+load_dotenv()
+
+REPLICA_CHECK_INTERVAL_SECONDS = float(os.getenv("REPLICA_CHECK_INTERVAL_SECONDS", "10"))
+
+# Отставание реплики в секундах; 0, если все полученное WAL уже применено
+# (иначе при простое основной БД отставание росло бы без реальных изменений)
+LAG_QUERY = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+class ReplicaMonitor(PeriodicJob):
+    """Проверяет доступность и отставание реплики и включает/выключает чтение из нее."""
+
+    name = "replica_monitor"
+
+    async def run_once(self) -> int:
+        if ReplicaSessionLocal is None:
+            return 0
+        try:
+            async with ReplicaSessionLocal() as db:
+                if db.bind.dialect.name == "postgresql":
+                    lag = float(await db.scalar(LAG_QUERY))
+                else:
+                    await db.execute(text("SELECT 1"))
+                    lag = 0.0
+        except Exception as e:
+            replica_health.mark_failed(repr(e))
+            return 0
+        if lag > REPLICA_MAX_LAG_SECONDS:
+            replica_health.mark_failed(f"отставание {lag:.1f} с")
+        else:
+            replica_health.mark_ok(lag)
+        return 0
+
+
+replica_monitor = ReplicaMonitor(REPLICA_CHECK_INTERVAL_SECONDS if ReplicaSessionLocal is not None else 0)
@@ -0,0 +1,74 @@
+import os
+
+from dotenv import load_dotenv
+from sqlalchemy import select, update, func
+
+from database import AsyncSessionLocal
+from models import Task, User
+from .common import PeriodicJob, try_job_lock
+
+load_dotenv()
+
+TASK_COUNT_RECONCILE_INTERVAL_SECONDS = float(os.getenv("TASK_COUNT_RECONCILE_INTERVAL_SECONDS", "3600"))
+TASK_COUNT_RECONCILE_BATCH_SIZE = int(os.getenv("TASK_COUNT_RECONCILE_BATCH_SIZE", "1000"))
+
+
+class TaskCountReconciler(PeriodicJob):
+    """
+    Сверяет users.tasks_count с таблицей tasks и исправляет расхождения.
+    Пользователи обходятся пачками по id, каждая пачка — отдельная короткая транзакция.
+    """
+
+    name = "task_count_reconcile"
+    lock_key = 0x54434E54  # "TCNT"
+
+    def __init__(self, interval: float, batch_size: int):
+        super().__init__(interval)
+        self.batch_size = batch_size
+
+    async def run_once(self) -> int:
+        repaired = 0
+        last_id = 0
+        while True:
+            result = await self._reconcile_batch(last_id)
+            if result is None:
+                return repaired
+            last_id, rows = result
+            repaired += rows
+
+    async def _reconcile_batch(self, last_id: int):
+        async with AsyncSessionLocal() as db:
+            if not await try_job_lock(db, self.lock_key):
+                return None
+            # Сначала блокируем строки пачки: запись задач этих пользователей подождет,
+            # а пересчет ниже увидит все уже зафиксированные задачи
+            ids = (await db.scalars(
+                select(User.id)
+                .where(User.id > last_id)
+                .order_by(User.id)
+                .limit(self.batch_size)
+                .with_for_update()
+            )).all()
+            if not ids:
+                return None
+            actual = (
+                select(func.count(Task.id))
+                .where(Task.user_id == User.id)
+                .scalar_subquery()
+            )
+            result = await db.execute(
+                update(User)
+                .where(User.id.in_(ids), User.tasks_count != actual)
+                .values(tasks_count=actual)
+                .returning(User.id)
+                .execution_options(synchronize_session=False)
+            )
+            rows = len(result.all())
+            await db.commit()
+            return ids[-1], rows
+
+
+task_count_reconciler = TaskCountReconciler(
+    TASK_COUNT_RECONCILE_INTERVAL_SECONDS,
+    TASK_COUNT_RECONCILE_BATCH_SIZE
+)
@@ -0,0 +1,65 @@
+import os
+from datetime import datetime, timedelta, timezone
+
+from dotenv import load_dotenv
+from sqlalchemy import select, delete
+
+from database import AsyncSessionLocal
+from models import TaskTombstone
+from task_sync import SYNC_TOMBSTONE_RETENTION_SECONDS
+from .common import PeriodicJob, try_job_lock
+
+load_dotenv()
+
+TOMBSTONE_COMPACT_INTERVAL_SECONDS = float(os.getenv("TOMBSTONE_COMPACT_INTERVAL_SECONDS", "3600"))
+TOMBSTONE_COMPACT_BATCH_SIZE = int(os.getenv("TOMBSTONE_COMPACT_BATCH_SIZE", "5000"))
+
+
+class TombstoneCompactor(PeriodicJob):
+    """
+    Удаляет следы удаленных задач старше SYNC_TOMBSTONE_RETENTION_SECONDS.
+    Кандидаты ищутся по индексу (deleted_at, task_id), удаление — пачками.
+    """
+
+    name = "tombstone_compact"
+    lock_key = 0x544F4D42  # "TOMB"
+
+    def __init__(self, interval: float, batch_size: int):
+        super().__init__(interval)
+        self.batch_size = batch_size
+
+    async def run_once(self) -> int:
+        boundary = datetime.now(timezone.utc) - timedelta(seconds=SYNC_TOMBSTONE_RETENTION_SECONDS)
+        removed = 0
+        while True:
+            rows = await self._compact_batch(boundary)
+            if rows is None:
+                return removed
+            removed += rows
+            if rows < self.batch_size:
+                return removed
+
+    async def _compact_batch(self, boundary: datetime):
+        async with AsyncSessionLocal() as db:
+            if not await try_job_lock(db, self.lock_key):
+                return None
+            batch = (
+                select(TaskTombstone.task_id)
+                .where(TaskTombstone.deleted_at < boundary)
+                .order_by(TaskTombstone.deleted_at, TaskTombstone.task_id)
+                .limit(self.batch_size)
+                .scalar_subquery()
+            )
+            result = await db.execute(
+                delete(TaskTombstone)
+                .where(TaskTombstone.task_id.in_(batch))
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+            return result.rowcount
+
+
+tombstone_compactor = TombstoneCompactor(
+    TOMBSTONE_COMPACT_INTERVAL_SECONDS,
+    TOMBSTONE_COMPACT_BATCH_SIZE
+)
@@ -1,23 +1,53 @@
-from fastapi import FastAPI, Depends
+import secrets
+
+from fastapi import FastAPI, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse
 from contextlib import asynccontextmanager
-from database import init_db, get_async_session
+from database import get_async_session, DATABASE_LISTEN_URL, engine, replica_engine
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, text
 from routers import tasks, stats
 from routers.auth import router as auth_router
 from routers.admin import router as admin_router
+from pg_listener import pg_listener
+from auth_utils import hashing_pool
+from jobs import quadrant_refresher, task_count_reconciler, replica_monitor, tombstone_compactor
+from admission import AdmissionMiddleware
+from metrics import MetricsMiddleware, instrument_engine, render_metrics, METRICS_TOKEN
+from migrations import ensure_schema, warm_up_pool
+from task_events import task_event_broker
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Код ДО yield выполняется при ЗАПУСКЕ
     print(" Запуск приложения...")
-    print(" Инициализация базы данных...")
-    # Создаем таблицы (если их нет)
-    await init_db()
+    print(" Проверка версии схемы БД...")
+    # Один SELECT версии; сами миграции — python migrations.py (или DB_AUTO_MIGRATE=true)
+    await ensure_schema()
+    # Соединения пула открываются до приема трафика, а не на первых запросах
+    await warm_up_pool()
+    # Межворкерные уведомления (сброс кеша пользователей) через LISTEN/NOTIFY
+    await pg_listener.start(DATABASE_LISTEN_URL)
+    # Фоновое обновление квадрантов по мере приближения дедлайнов
+    quadrant_refresher.start()
+    # Сверка users.tasks_count с таблицей tasks
+    task_count_reconciler.start()
+    # Удаление старых следов удаленных задач (дельта-синхронизация)
+    tombstone_compactor.start()
+    # Проверка доступности и отставания реплики (если она настроена)
+    replica_monitor.start()
     print(" Приложение готово к работе!")
     yield  # Здесь приложение работает
     # Код ПОСЛЕ yield выполняется при ОСТАНОВКЕ
     print(" Остановка приложения...")
+    # Потоки /tasks/events завершаются, иначе сервер ждал бы их отключения
+    task_event_broker.close()
+    await quadrant_refresher.stop()
+    await task_count_reconciler.stop()
+    await tombstone_compactor.stop()
+    await replica_monitor.stop()
+    await pg_listener.stop()
+    hashing_pool.shutdown()
 
 app = FastAPI(
     title="ToDo лист API",
@@ -29,6 +59,14 @@ app = FastAPI(
     lifespan=lifespan  # Подключаем lifespan
 )
 
+# Ограничение одновременных запросов по группам маршрутов: при перегрузке — быстрый 503
+app.add_middleware(AdmissionMiddleware)
+# Латентность, число запросов к БД и Server-Timing; внешний слой — учитывает и отказы admission control
+app.add_middleware(MetricsMiddleware)
+instrument_engine(engine.sync_engine)
+if replica_engine is not None:
+    instrument_engine(replica_engine.sync_engine)
+
 app.include_router(tasks.router, prefix="/api/v3")  # подключение роутера к приложению
 app.include_router(stats.router, prefix="/api/v3")
 app.include_router(auth_router, prefix="/api/v3")
@@ -44,6 +82,16 @@ async def read_root() -> dict:
         "redoc": "/redoc",
     }
 
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics(authorization: str = Header("")) -> PlainTextResponse:
+    # Формат Prometheus; метрики относятся к текущему воркеру.
+    # Доступ только с METRICS_TOKEN; без него эндпоинт как будто не существует
+    if METRICS_TOKEN is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not secrets.compare_digest(authorization.encode(), f"Bearer {METRICS_TOKEN}".encode()):
+        raise HTTPException(status_code=401, detail="Неверный токен метрик", headers={"WWW-Authenticate": "Bearer"})
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 @app.get("/health")
 async def health_check(
     db: AsyncSession = Depends(get_async_session)
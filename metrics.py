@@ -0,0 +1,228 @@
+import logging
+import os
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Запросы к БД дольше порога пишутся в лог (0 — не писать)
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "200"))
+# Server-Timing раскрывает клиенту время и число запросов к БД — включается явно (для отладки)
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "false").lower() in ("1", "true", "yes")
+
+# Токен для GET /metrics (Authorization: Bearer <токен>); без токена эндпоинт выключен
+METRICS_TOKEN = os.getenv("METRICS_TOKEN") or None
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    """Гистограмма в формате Prometheus: накопительные бакеты, сумма и число наблюдений по меткам."""
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            # [счетчики бакетов..., сумма, количество]
+            series = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self._series.items()):
+            base = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(self.label_names, labels))
+            sep = "," if base else ""
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{{{base}{sep}le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{base}{sep}le="+Inf"}} {series[-1]}')
+            suffix = f"{{{base}}}" if base else ""
+            lines.append(f"{self.name}_sum{suffix} {series[-2]:.6f}")
+            lines.append(f"{self.name}_count{suffix} {series[-1]}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Время обработки HTTP-запроса",
+    ("method", "route", "status"),
+    LATENCY_BUCKETS
+)
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Число запросов к БД на один HTTP-запрос",
+    ("method", "route"),
+    QUERY_COUNT_BUCKETS
+)
+REQUEST_DB_TIME = Histogram(
+    "http_request_db_duration_seconds",
+    "Суммарное время запросов к БД на один HTTP-запрос",
+    ("method", "route"),
+    LATENCY_BUCKETS
+)
+QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds",
+    "Время выполнения одного запроса к БД",
+    (),
+    LATENCY_BUCKETS
+)
+slow_queries = 0
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+# Статистика текущего HTTP-запроса; контекст доходит до обработчиков событий
+# SQLAlchemy, которые выполняются в greenlet того же asyncio-таска
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    global slow_queries
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    QUERY_LATENCY.observe(elapsed)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+    if SLOW_QUERY_THRESHOLD_MS > 0 and elapsed * 1000 >= SLOW_QUERY_THRESHOLD_MS:
+        slow_queries += 1
+        logger.warning("Медленный запрос (%.1f мс): %s", elapsed * 1000, " ".join(statement.split()))
+
+
+def _handle_error(exception_context):
+    # Запрос упал: снимаем его отметку времени, чтобы стек не рос
+    started = exception_context.connection.info.get("query_started") if exception_context.connection else None
+    if started:
+        started.pop()
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Подключает счетчики запросов к синхронному движку (для AsyncEngine — engine.sync_engine)."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware: латентность и число запросов к БД по маршрутам,
+    заголовок Server-Timing (app, db) в каждом ответе.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if SERVER_TIMING_ENABLED:
+                    timing = (
+                        f"app;dur={(time.perf_counter() - started) * 1000:.1f}, "
+                        f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries"'
+                    )
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"server-timing", timing.encode())
+                    ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_stats.reset(token)
+            # Шаблон пути, а не сам путь: иначе метки разрастутся по числу id
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            REQUEST_LATENCY.observe(time.perf_counter() - started, method, route_path, str(status_code))
+            REQUEST_QUERIES.observe(stats.queries, method, route_path)
+            REQUEST_DB_TIME.observe(stats.db_seconds, method, route_path)
+
+
+def _gauges(prefix: str, help_text: str, rows: Dict[str, dict]) -> list:
+    """rows: метка -> {показатель: значение}; метка "" — без меток."""
+    keys = []
+    for values in rows.values():
+        keys.extend(k for k, v in values.items()
+                    if k not in keys and isinstance(v, (int, float)) and not isinstance(v, bool))
+    lines = []
+    for key in keys:
+        name = f"{prefix}_{key}"
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        for label, values in rows.items():
+            if key in values:
+                lines.append(f"{name}{{{label}}} {values[key]}" if label else f"{name} {values[key]}")
+    return lines
+
+
+def render_metrics() -> str:
+    """Все метрики в текстовом формате Prometheus (text/plain; version=0.0.4)."""
+    from admission import admission_stats
+    from database import pool_stats, replica_engine
+    from read_routing import replica_stats
+    from single_flight import single_flight_stats
+    from task_events import task_event_broker
+
+    lines = []
+    for histogram in (REQUEST_LATENCY, REQUEST_QUERIES, REQUEST_DB_TIME, QUERY_LATENCY):
+        lines.extend(histogram.render())
+    lines.extend([
+        "# HELP db_slow_queries_total Запросы к БД дольше SLOW_QUERY_THRESHOLD_MS",
+        "# TYPE db_slow_queries_total counter",
+        f"db_slow_queries_total {slow_queries}",
+    ])
+    lines.extend(_gauges("db_pool", "Состояние пула соединений", {"": pool_stats()}))
+    if replica_engine is not None:
+        lines.extend(_gauges("db_replica_pool", "Состояние пула соединений реплики", {"": pool_stats(replica_engine.pool)}))
+        lines.extend(_gauges("db_replica", "Маршрутизация чтений в реплику", {"": replica_stats()}))
+    flights = single_flight_stats()
+    lines.extend(_gauges("single_flight", "Объединение одинаковых одновременных чтений", {
+        "": {"in_flight": flights["in_flight"]},
+        **{f'endpoint="{endpoint}"': values for endpoint, values in flights["endpoints"].items()},
+    }))
+    lines.extend(_gauges("task_events", "Подписки на поток изменений задач", {"": task_event_broker.stats()}))
+    lines.extend(_gauges("admission", "Admission control по группам маршрутов", {
+        f'group="{group}"': values for group, values in admission_stats().items()
+    }))
+    return "\n".join(lines) + "\n"
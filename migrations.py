@@ -0,0 +1,280 @@
+"""
+Версионированные миграции схемы БД.
+
+    python migrations.py            # применить недостающие миграции
+    python migrations.py --status   # текущая и последняя версии схемы
+
+Каждая миграция — функция над синхронным соединением (conn.run_sync) с проверками
+«уже сделано?», поэтому одинаково работает на новой и на существующей базе.
+Обычная миграция выполняется в своей транзакции вместе с записью номера версии.
+Миграции, которые на большой таблице держали бы блокировки всю транзакцию (индексы,
+заполнение колонок), идут вне транзакции: индексы в PostgreSQL строятся CONCURRENTLY,
+данные обновляются пачками. В PostgreSQL одновременно мигрирует только один процесс
+(advisory lock на время всего запуска).
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Callable, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import inspect, select, text, update, func
+from sqlalchemy.engine import Connection
+from sqlalchemy.schema import Index
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from database import Base, engine, replica_engine, DB_POOL_SIZE
+from models import SchemaVersion, Task, User
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# true — приложение само применяет миграции при старте (удобно для разработки);
+# в проде миграции запускаются явно: python migrations.py
+DB_AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "false").lower() in ("1", "true", "yes")
+# Сколько соединений открыть заранее при старте воркера (по умолчанию — весь DB_POOL_SIZE)
+DB_POOL_WARMUP = int(os.getenv("DB_POOL_WARMUP", str(DB_POOL_SIZE)))
+
+MIGRATION_LOCK_KEY = 0x4D494752  # "MIGR"
+# Строк в одной транзакции при заполнении колонок вне транзакции миграции
+MIGRATION_BATCH_SIZE = int(os.getenv("MIGRATION_BATCH_SIZE", "10000"))
+
+
+def _has_column(conn: Connection, table: str, column: str) -> bool:
+    return any(c["name"] == column for c in inspect(conn).get_columns(table))
+
+
+def create_tables(conn: Connection) -> None:
+    # Недостающие таблицы создаются сразу в актуальном виде (вместе с их индексами)
+    Base.metadata.create_all(conn, checkfirst=True)
+
+
+def add_users_tasks_count(conn: Connection) -> None:
+    if not _has_column(conn, "users", "tasks_count"):
+        conn.execute(text("ALTER TABLE users ADD COLUMN tasks_count INTEGER NOT NULL DEFAULT 0"))
+    actual = select(func.count(Task.id)).where(Task.user_id == User.id).scalar_subquery()
+    conn.execute(update(User).values(tasks_count=actual))
+
+
+def _create_index_concurrently(conn: Connection, index: Index) -> None:
+    # CREATE INDEX CONCURRENTLY не блокирует запись в таблицу, но не работает в транзакции
+    options = index.dialect_options["postgresql"]
+    options["concurrently"] = True
+    try:
+        index.create(conn, checkfirst=True)
+    finally:
+        options["concurrently"] = False
+
+
+def create_missing_indexes(conn: Connection) -> None:
+    # Индексы, добавленные в модели после создания таблиц; PG-only индексы (ddl_if) в других СУБД
+    # пропускаются. Индексы по колонкам, которых еще нет, создаст миграция после добавления колонок.
+    # Выполняется вне транзакции: в PostgreSQL индексы строятся CONCURRENTLY
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        # Прерванный CREATE INDEX CONCURRENTLY оставляет невалидный индекс — строим заново
+        invalid = conn.execute(text(
+            "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE NOT i.indisvalid AND c.relnamespace = current_schema()::regnamespace"
+        )).scalars().all()
+        for name in invalid:
+            conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"'))
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        existing = {c["name"] for c in inspector.get_columns(table.name)}
+        for index in table.indexes:
+            if not all(column.name in existing for column in index.columns):
+                continue
+            if conn.dialect.name == "postgresql":
+                _create_index_concurrently(conn, index)
+            else:
+                index.create(conn, checkfirst=True)
+
+
+def add_tasks_updated_at(conn: Connection) -> None:
+    # Только изменения каталога: значения заполнит миграция 6 пачками, индексы — миграция 7
+    if not _has_column(conn, "tasks", "updated_at"):
+        if conn.dialect.name == "postgresql":
+            # Без DEFAULT в ADD COLUMN существующие строки не переписываются; новые получают now()
+            conn.execute(text("ALTER TABLE tasks ADD COLUMN updated_at TIMESTAMPTZ"))
+            conn.execute(text("ALTER TABLE tasks ALTER COLUMN updated_at SET DEFAULT now()"))
+        else:
+            # SQLite не добавляет колонку с неконстантным DEFAULT; значение задает модель
+            conn.execute(text("ALTER TABLE tasks ADD COLUMN updated_at DATETIME"))
+    # Таблица task_tombstones (новая и пустая — вместе с индексами)
+    create_tables(conn)
+
+
+def backfill_tasks_updated_at(conn: Connection) -> None:
+    # Вне транзакции: каждая пачка фиксируется сразу и держит блокировки только своих строк
+    pending = select(Task.id).where(Task.updated_at.is_(None)).limit(MIGRATION_BATCH_SIZE).scalar_subquery()
+    while conn.execute(
+        update(Task).where(Task.id.in_(pending))
+        .values(updated_at=func.coalesce(Task.completed_at, Task.created_at))
+    ).rowcount:
+        pass
+    if conn.dialect.name != "postgresql":
+        return
+    nullable = next(c["nullable"] for c in inspect(conn).get_columns("tasks") if c["name"] == "updated_at")
+    if nullable:
+        # SET NOT NULL без полного сканирования под эксклюзивной блокировкой: сначала проверка
+        # NOT VALID + VALIDATE (не блокирует запись), затем SET NOT NULL опирается на нее
+        conn.execute(text("ALTER TABLE tasks DROP CONSTRAINT IF EXISTS tasks_updated_at_not_null"))
+        conn.execute(text(
+            "ALTER TABLE tasks ADD CONSTRAINT tasks_updated_at_not_null CHECK (updated_at IS NOT NULL) NOT VALID"
+        ))
+        conn.execute(text("ALTER TABLE tasks VALIDATE CONSTRAINT tasks_updated_at_not_null"))
+        conn.execute(text("ALTER TABLE tasks ALTER COLUMN updated_at SET NOT NULL"))
+        conn.execute(text("ALTER TABLE tasks DROP CONSTRAINT tasks_updated_at_not_null"))
+
+
+def normalize_sqlite_created_at(conn: Connection) -> None:
+    # CURRENT_TIMESTAMP в SQLite хранит время без долей секунды, а курсор пагинации сравнивается
+    # как строка в формате SQLAlchemy (с микросекундами): приводим старые значения к нему
+    if conn.dialect.name != "sqlite":
+        return
+    conn.execute(text(
+        "UPDATE tasks SET created_at = created_at || '.000000' WHERE length(created_at) = 19"
+    ))
+
+
+# (версия, описание, функция, в транзакции ли); новые миграции только дописываются в конец.
+# Миграция вне транзакции должна быть идемпотентной: при обрыве она повторится целиком
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None], bool]] = [
+    (1, "Таблицы по моделям", create_tables, True),
+    (2, "users.tasks_count", add_users_tasks_count, True),
+    (3, "Индексы задач и пользователей", create_missing_indexes, False),
+    (4, "tasks.updated_at и task_tombstones", add_tasks_updated_at, True),
+    (5, "tasks.created_at с микросекундами в SQLite", normalize_sqlite_created_at, True),
+    (6, "Заполнение tasks.updated_at", backfill_tasks_updated_at, False),
+    (7, "Индексы по tasks.updated_at", create_missing_indexes, False),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def _read_version(conn: Connection) -> Optional[int]:
+    if not inspect(conn).has_table(SchemaVersion.__tablename__):
+        return None
+    return conn.execute(select(SchemaVersion.version)).scalar()
+
+
+async def get_schema_version(bind: AsyncEngine = engine) -> Optional[int]:
+    """
+    Версия схемы или None, если база еще не мигрировалась. Ошибки подключения
+    не маскируются под «схема не создана» — они прерывают запуск.
+    """
+    async with bind.connect() as conn:
+        return await conn.run_sync(_read_version)
+
+
+def _write_version(conn: Connection, version: int) -> None:
+    conn.execute(SchemaVersion.__table__.delete())
+    conn.execute(SchemaVersion.__table__.insert().values(id=1, version=version))
+
+
+async def migrate(bind: AsyncEngine = engine) -> int:
+    """Применяет недостающие миграции; возвращает итоговую версию схемы."""
+    async with bind.connect() as conn:
+        postgresql = conn.dialect.name == "postgresql"
+        if postgresql:
+            # Блокировка сеанса, а не транзакции: миграции идут в нескольких транзакциях
+            await conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+            await conn.commit()
+        try:
+            async with conn.begin():
+                current = await conn.run_sync(_read_version) or 0
+            if current > LATEST_VERSION:
+                raise RuntimeError(f"Схема БД версии {current} новее кода (ожидается {LATEST_VERSION})")
+            for version, description, step, transactional in MIGRATIONS:
+                if version <= current:
+                    continue
+                started = time.perf_counter()
+                if transactional:
+                    async with conn.begin():
+                        await conn.run_sync(step)
+                        await conn.run_sync(_write_version, version)
+                else:
+                    async with bind.connect() as autocommit:
+                        await autocommit.execution_options(isolation_level="AUTOCOMMIT")
+                        await autocommit.run_sync(step)
+                    async with conn.begin():
+                        await conn.run_sync(_write_version, version)
+                logger.info("Миграция %s (%s) применена за %.2f с", version, description, time.perf_counter() - started)
+                print(f" Миграция {version}: {description}")
+        finally:
+            if postgresql:
+                await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+                await conn.commit()
+    return LATEST_VERSION
+
+
+async def ensure_schema() -> None:
+    """
+    Проверка при старте воркера: наличие таблицы и SELECT версии вместо create_all с отражением всех таблиц.
+    Если схема устарела — мигрирует (DB_AUTO_MIGRATE=true) или останавливает запуск.
+    """
+    version = await get_schema_version()
+    if version == LATEST_VERSION:
+        return
+    if version is not None and version > LATEST_VERSION:
+        raise RuntimeError(f"Схема БД версии {version} новее кода (ожидается {LATEST_VERSION})")
+    if not DB_AUTO_MIGRATE:
+        state = "не инициализирована" if version is None else f"версии {version} устарела"
+        raise RuntimeError(
+            f"Схема БД {state} (ожидается версия {LATEST_VERSION}): "
+            "выполните python migrations.py или задайте DB_AUTO_MIGRATE=true"
+        )
+    await migrate()
+
+
+async def _warm_up_engine(bind: AsyncEngine, connections: int) -> None:
+    # Соединения открываются одновременно и возвращаются в пул только после того,
+    # как открыты все: иначе пул переиспользовал бы одно и то же соединение
+    async def open_one():
+        conn = await bind.connect()
+        await conn.execute(text("SELECT 1"))
+        return conn
+
+    results = await asyncio.gather(*(open_one() for _ in range(connections)), return_exceptions=True)
+    for result in results:
+        if not isinstance(result, BaseException):
+            await result.close()
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+
+
+async def warm_up_pool() -> None:
+    """Заранее открывает DB_POOL_WARMUP соединений, чтобы первые запросы не ждали подключения."""
+    if DB_POOL_WARMUP <= 0:
+        return
+    started = time.perf_counter()
+    await _warm_up_engine(engine, DB_POOL_WARMUP)
+    if replica_engine is not None:
+        try:
+            await _warm_up_engine(replica_engine, DB_POOL_WARMUP)
+        except Exception as e:
+            # Недоступная реплика не должна мешать старту: чтения уйдут в основную БД
+            logger.warning("Не удалось прогреть пул реплики: %r", e)
+    print(f" Пул соединений прогрет ({DB_POOL_WARMUP}) за {time.perf_counter() - started:.2f} с")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--status", action="store_true", help="только показать версии схемы")
+    args = parser.parse_args()
+
+    async def main():
+        try:
+            if args.status:
+                print(f"Версия схемы: {await get_schema_version()}, последняя: {LATEST_VERSION}")
+            else:
+                print(f"Схема БД обновлена до версии {await migrate()}")
+        finally:
+            await engine.dispose()
+
+    asyncio.run(main())
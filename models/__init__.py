@@ -1,6 +1,10 @@
 from database import Base
 from .task import Task
 from .user import User, UserRole
+from .task_counter import TaskCounter
+from .task_version import TaskVersion
+from .schema_version import SchemaVersion
+from .task_tombstone import TaskTombstone
 
-__all__ = ["Base", "Task", "User", "UserRole"]
+__all__ = ["Base", "Task", "User", "UserRole", "TaskCounter", "TaskVersion", "SchemaVersion", "TaskTombstone"]
 
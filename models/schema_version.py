@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, DateTime, func
+from database import Base
+
+
+class SchemaVersion(Base):
+    """Версия схемы БД: одна строка, которую ведет migrations.py."""
+    __tablename__ = "schema_version"
+
+    id = Column(Integer, primary_key=True, default=1)
+    version = Column(Integer, nullable=False)
+    applied_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<SchemaVersion(version={self.version})>"
@@ -1,7 +1,24 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Index, DDL, event
+from sqlalchemy import literal_column
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from database import Base
+from sql_functions import utc_now
+
+
+# Конфигурация полнотекстового поиска PostgreSQL; константа нужна и в индексе, и в запросе
+SEARCH_CONFIG = literal_column("'simple'::regconfig")
+
+
+def search_document(title, description):
+    """tsvector по названию и описанию — выражение должно совпадать с индексом ix_tasks_search."""
+    # Литералы вместо bind-параметров, иначе планировщик не сопоставит выражение с индексом
+    empty, space = literal_column("''", Text), literal_column("' '", Text)
+    return func.to_tsvector(
+        SEARCH_CONFIG,
+        func.coalesce(title, empty) + space + func.coalesce(description, empty)
+    )
+
 
 class Task(Base):
     __tablename__ = "tasks"
@@ -46,19 +63,60 @@ class Task(Base):
     )
     created_at = Column(
         DateTime(timezone=True),   # С поддержкой часовых поясов
-        server_default=func.now(), # Автоматически текущее время
+        default=utc_now(),         # Автоматически текущее время (в SQLite — с микросекундами,
+        server_default=func.now(), # иначе курсор страницы пропускал задачи той же секунды)
         nullable=False
     )
     completed_at = Column(
         DateTime(timezone=True),
         nullable=True              # NULL пока задача не завершена
     )
+    updated_at = Column(
+        DateTime(timezone=True),
+        default=utc_now(),         # Задается и при вставке, и при любом UPDATE,
+        onupdate=utc_now(),        # в том числе массовом (jobs.quadrants);
+        server_default=func.now(), # при COPY — значением по умолчанию колонки
+        nullable=False
+    )
 
     owner = relationship(
         "User",
         back_populates="tasks"
     )
 
+    __table_args__ = (
+        # Индексы под keyset-пагинацию списков: (created_at, id) и (deadline_at, id)
+        Index("ix_tasks_user_created_id", "user_id", "created_at", "id"),
+        Index("ix_tasks_user_deadline_id", "user_id", "deadline_at", "id"),
+        Index("ix_tasks_created_id", "created_at", "id"),
+        # Дельта-синхронизация (/tasks/changes): изменения после водяного знака
+        Index("ix_tasks_user_updated_id", "user_id", "updated_at", "id"),
+        Index("ix_tasks_updated_id", "updated_at", "id"),
+        # Ближайшие дедлайны невыполненных задач пользователя (/stats/deadlines)
+        Index("ix_tasks_user_completed_deadline", "user_id", "completed", "deadline_at"),
+        # Поиск задач, вошедших в окно срочности (jobs.quadrants)
+        Index("ix_tasks_quadrant_deadline", "quadrant", "deadline_at"),
+        # Поиск (/tasks/search): GIN по tsvector и триграммные индексы для ILIKE '%q%'.
+        # Только для PostgreSQL — в SQLite поиск идет через Python-фолбэк
+        Index(
+            "ix_tasks_search",
+            search_document(title, description),
+            postgresql_using="gin"
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_tasks_title_trgm",
+            "title",
+            postgresql_using="gin",
+            postgresql_ops={"title": "gin_trgm_ops"}
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_tasks_description_trgm",
+            "description",
+            postgresql_using="gin",
+            postgresql_ops={"description": "gin_trgm_ops"}
+        ).ddl_if(dialect="postgresql"),
+    )
+
     def __repr__(self) -> str:
         return f"<Task(id={self.id}, title='{self.title}', quadrant='{self.quadrant}')>"
 
@@ -72,6 +130,14 @@ class Task(Base):
             "quadrant": self.quadrant,
             "completed": self.completed,
             "created_at": self.created_at,
-            "completed_at": self.completed_at
+            "completed_at": self.completed_at,
+            "updated_at": self.updated_at
         }
 
+
+# Триграммные индексы требуют расширения pg_trgm
+event.listen(
+    Task.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+)
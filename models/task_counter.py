@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, ForeignKey
+from database import Base
+
+
+class TaskCounter(Base):
+    """Денормализованные счетчики задач пользователя для O(1)-чтения статистики."""
+    __tablename__ = "task_counters"
+
+    user_id = Column(
+        Integer,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    q1 = Column(Integer, nullable=False, default=0, server_default="0")
+    q2 = Column(Integer, nullable=False, default=0, server_default="0")
+    q3 = Column(Integer, nullable=False, default=0, server_default="0")
+    q4 = Column(Integer, nullable=False, default=0, server_default="0")
+    completed = Column(Integer, nullable=False, default=0, server_default="0")
+
+    def __repr__(self) -> str:
+        return f"<TaskCounter(user_id={self.user_id}, q1={self.q1}, q2={self.q2}, q3={self.q3}, q4={self.q4})>"
@@ -0,0 +1,30 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+from database import Base
+from sql_functions import utc_now
+
+
+class TaskTombstone(Base):
+    """След удаленной задачи для дельта-синхронизации; старые следы удаляет jobs.tombstones."""
+    __tablename__ = "task_tombstones"
+
+    task_id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(
+        Integer,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=True
+    )
+    deleted_at = Column(
+        DateTime(timezone=True),
+        default=utc_now(),
+        server_default=func.now(),
+        nullable=False
+    )
+
+    __table_args__ = (
+        Index("ix_task_tombstones_user_deleted_id", "user_id", "deleted_at", "task_id"),
+        Index("ix_task_tombstones_deleted_id", "deleted_at", "task_id"),
+    )
+
+    def __repr__(self) -> str:
+        return f"<TaskTombstone(task_id={self.task_id}, user_id={self.user_id})>"
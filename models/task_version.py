@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, BigInteger, ForeignKey
+from database import Base
+
+
+class TaskVersion(Base):
+    """Версия набора задач пользователя: растет при каждой записи, из нее строится ETag."""
+    __tablename__ = "task_versions"
+
+    user_id = Column(
+        Integer,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    version = Column(BigInteger, nullable=False, default=0, server_default="0")
+
+    def __repr__(self) -> str:
+        return f"<TaskVersion(user_id={self.user_id}, version={self.version})>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Enum as SQLEnum, Index
 from sqlalchemy.orm import relationship
 from database import Base
 import enum
@@ -39,6 +39,14 @@ class User(Base):
         nullable=False,
         default=UserRole.USER  # По умолчанию - обычный пользователь
     )
+    # Денормализованное число задач: поддерживают операции записи задач (TaskChangeSet),
+    # расхождения исправляет фоновая задача jobs.task_counts
+    tasks_count = Column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default="0"
+    )
 
     # Связь с задачами (один пользователь -> много задач)
     tasks = relationship(
@@ -47,6 +55,11 @@ class User(Base):
         cascade="all, delete-orphan"  # При удалении пользователя удаляются его задачи
     )
 
+    __table_args__ = (
+        # Сортировка списка пользователей по числу задач (keyset по (tasks_count, id))
+        Index("ix_users_tasks_count_id", "tasks_count", "id"),
+    )
+
     def __repr__(self) -> str:
         return f"<User(id={self.id}, nickname='{self.nickname}', role='{self.role.value}')>"
 
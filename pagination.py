@@ -0,0 +1,66 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional, Sequence
+
+from fastapi import HTTPException, status
+from sqlalchemy import DateTime, Select, tuple_
+from sqlalchemy.sql.elements import ColumnElement
+
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    # Курсор непрозрачен для клиента: base64 от JSON-списка значений ключа сортировки
+    raw = json.dumps(
+        [v.isoformat() if isinstance(v, datetime) else v for v in values],
+        separators=(",", ":")
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: Sequence[ColumnElement]) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError
+        return [
+            datetime.fromisoformat(v) if isinstance(col.type, DateTime) else v
+            for v, col in zip(values, columns)
+        ]
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Некорректный курсор"
+        )
+
+
+def paginate(
+    stmt: Select,
+    columns: Sequence[ColumnElement],
+    cursor: Optional[str],
+    limit: int,
+    descending: bool = False
+) -> Select:
+    """
+    Keyset-пагинация: WHERE (col1, col2) > (:v1, :v2) ORDER BY col1, col2 LIMIT n + 1.
+    Лишняя строка нужна только чтобы понять, есть ли следующая страница.
+    """
+    if cursor is not None:
+        values = decode_cursor(cursor, columns)
+        key, bound = tuple_(*columns), tuple_(*values)
+        stmt = stmt.where(key < bound if descending else key > bound)
+    order = [c.desc() for c in columns] if descending else list(columns)
+    return stmt.order_by(*order).limit(limit + 1)
+
+
+def build_page(rows: Sequence[Any], keys: Sequence[str], limit: int) -> dict:
+    items = list(rows[:limit])
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = encode_cursor([getattr(last, k) for k in keys])
+    return {"items": items, "next_cursor": next_cursor}
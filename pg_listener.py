@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import os
+from typing import Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Пауза перед повторным подключением после обрыва
+PG_LISTEN_RECONNECT_SECONDS = float(os.getenv("PG_LISTEN_RECONNECT_SECONDS", "2"))
+# Как часто проверять простаивающее соединение (обрыв сети без закрытия сокета иначе не заметен)
+PG_LISTEN_PING_SECONDS = float(os.getenv("PG_LISTEN_PING_SECONDS", "30"))
+
+
+class PgListener:
+    """
+    Подписка на каналы PostgreSQL LISTEN/NOTIFY для рассылки событий между воркерами.
+    Держит одно отдельное asyncpg-соединение вне пула и переподключается при обрыве;
+    уведомления, пропущенные за время обрыва, подписчики восполняют в on_reconnect.
+    Для других СУБД ничего не делает.
+    """
+
+    def __init__(self):
+        self._callbacks: Dict[str, List[Callable[[str], None]]] = {}
+        self._reconnect_callbacks: List[Callable[[], None]] = []
+        self._conn = None
+        self._task: Optional[asyncio.Task] = None
+        self.connected = False
+        self.disconnects = 0
+
+    def subscribe(self, channel: str, callback: Callable[[str], None]) -> None:
+        self._callbacks.setdefault(channel, []).append(callback)
+
+    def on_reconnect(self, callback: Callable[[], None]) -> None:
+        """callback вызывается после каждого подключения: уведомления, пока соединения не было, потеряны."""
+        self._reconnect_callbacks.append(callback)
+
+    def _dispatch(self, connection, pid, channel: str, payload: str) -> None:
+        for callback in self._callbacks.get(channel, []):
+            try:
+                callback(payload)
+            except Exception:
+                logger.exception("Ошибка обработки уведомления из канала %s", channel)
+
+    async def start(self, database_url: Optional[str]) -> None:
+        if not database_url or self._task is not None:
+            return
+        url = make_url(database_url)
+        if url.get_backend_name() != "postgresql" or not self._callbacks:
+            return
+        dsn = url.set(drivername="postgresql").render_as_string(hide_password=False)
+        self._task = asyncio.create_task(self._run(dsn))
+
+    async def _run(self, dsn: str) -> None:
+        import asyncpg
+
+        while True:
+            lost = asyncio.Event()
+            try:
+                self._conn = await asyncpg.connect(dsn, statement_cache_size=0)
+                self._conn.add_termination_listener(lambda connection, lost=lost: lost.set())
+                for channel in self._callbacks:
+                    await self._conn.add_listener(channel, self._dispatch)
+                self.connected = True
+                # Пока соединения не было, уведомления терялись (в том числе до первого подключения)
+                for callback in self._reconnect_callbacks:
+                    callback()
+                while not lost.is_set():
+                    try:
+                        await asyncio.wait_for(lost.wait(), PG_LISTEN_PING_SECONDS)
+                    except asyncio.TimeoutError:
+                        await asyncio.wait_for(self._conn.execute("SELECT 1"), PG_LISTEN_PING_SECONDS)
+                self.disconnects += 1
+                logger.warning("LISTEN/NOTIFY: соединение закрыто, переподключение")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if self.connected:
+                    self.disconnects += 1
+                logger.warning("LISTEN/NOTIFY: ошибка соединения, переподключение: %r", e)
+            finally:
+                self.connected = False
+                if self._conn is not None:
+                    self._conn.terminate()
+                    self._conn = None
+            await asyncio.sleep(PG_LISTEN_RECONNECT_SECONDS)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+pg_listener = PgListener()
+
+
+async def notify(db: AsyncSession, channel: str, payload: str) -> None:
+    """pg_notify в текущей транзакции: подписчики получат событие только после commit."""
+    if db.bind.dialect.name == "postgresql":
+        await db.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": channel, "payload": payload}
+        )
@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import os
+import time
+from typing import AsyncGenerator, Iterable, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from cache import TTLCache
+from database import AsyncSessionLocal, ReplicaSessionLocal
+from models import User, UserRole
+from pg_listener import pg_listener, notify
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# После записи чтения пользователя идут в основную БД столько секунд (больше типичного лага реплики)
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+# Реплика с отставанием больше порога считается нездоровой
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+# Сколько секунд не ходить в реплику после ошибки подключения
+REPLICA_RETRY_SECONDS = float(os.getenv("REPLICA_RETRY_SECONDS", "10"))
+# Сообщать о записи другим воркерам через NOTIFY — только явно: каждая запись задач тогда
+# делает pg_notify, а commit с NOTIFY берет общую для всей БД блокировку очереди уведомлений
+READ_YOUR_WRITES_PG_FANOUT = os.getenv("READ_YOUR_WRITES_PG_FANOUT", "false").lower() in ("1", "true", "yes")
+READ_YOUR_WRITES_CHANNEL = "read_your_writes"
+
+REPLICA_ENABLED = ReplicaSessionLocal is not None
+
+# user_id -> True, пока не истек READ_YOUR_WRITES_SECONDS после последней записи
+recent_writers = TTLCache(maxsize=100000, ttl=READ_YOUR_WRITES_SECONDS)
+
+
+class ReplicaHealth:
+    def __init__(self):
+        self.unhealthy_until = 0.0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self.last_lag_seconds: Optional[float] = None
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.unhealthy_until
+
+    def mark_failed(self, reason: str) -> None:
+        if self.healthy:
+            logger.warning("Реплика выключена из чтения на %s с: %s", REPLICA_RETRY_SECONDS, reason)
+        self.failures += 1
+        self.last_error = reason
+        self.unhealthy_until = time.monotonic() + REPLICA_RETRY_SECONDS
+
+    def mark_ok(self, lag_seconds: float) -> None:
+        self.last_lag_seconds = lag_seconds
+        self.unhealthy_until = 0.0
+
+
+replica_health = ReplicaHealth()
+routing_counters = {
+    "replica": 0,
+    "primary_recent_write": 0,
+    "primary_admin": 0,
+    "primary_unhealthy": 0,
+    "fallbacks": 0,
+}
+
+
+def _on_write(payload: str) -> None:
+    for user_id in payload.split(","):
+        recent_writers.set(int(user_id), True)
+
+
+if REPLICA_ENABLED and READ_YOUR_WRITES_PG_FANOUT:
+    pg_listener.subscribe(READ_YOUR_WRITES_CHANNEL, _on_write)
+
+
+async def mark_write(db: AsyncSession, user_ids: Iterable[int]) -> None:
+    """
+    Отмечает пользователей, чьи задачи изменились: их чтения ближайшие
+    READ_YOUR_WRITES_SECONDS пойдут в основную БД. Другим воркерам — через NOTIFY
+    (READ_YOUR_WRITES_PG_FANOUT), иначе отметка действует только в этом воркере.
+    """
+    if not REPLICA_ENABLED:
+        return
+    user_ids = sorted(set(user_ids))
+    if not user_ids:
+        return
+    for user_id in user_ids:
+        recent_writers.set(user_id, True)
+    if READ_YOUR_WRITES_PG_FANOUT:
+        await notify(db, READ_YOUR_WRITES_CHANNEL, ",".join(map(str, user_ids)))
+
+
+def choose_sessionmaker(user: User) -> async_sessionmaker:
+    """Реплика, если она есть и здорова, а пользователь не писал только что; иначе основная БД."""
+    if not REPLICA_ENABLED:
+        return AsyncSessionLocal
+    # ADMIN видит задачи всех пользователей, ему нужна свежая картина
+    if user.role == UserRole.ADMIN:
+        routing_counters["primary_admin"] += 1
+        return AsyncSessionLocal
+    if recent_writers.get(user.id):
+        routing_counters["primary_recent_write"] += 1
+        return AsyncSessionLocal
+    if not replica_health.healthy:
+        routing_counters["primary_unhealthy"] += 1
+        return AsyncSessionLocal
+    routing_counters["replica"] += 1
+    return ReplicaSessionLocal
+
+
+async def open_read_session(user: User, primary: AsyncSession) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Сессия для чтения. primary — сессия запроса к основной БД (через нее шла аутентификация):
+    чтения из основной БД идут через нее же, а не через второе соединение из пула.
+    Соединение с репликой берется сразу: если она недоступна, запрос прозрачно уходит
+    в основную БД, а реплика на время выключается.
+    """
+    if choose_sessionmaker(user) is ReplicaSessionLocal:
+        # Соединение основной БД, взятое для аутентификации, не держим до конца запроса
+        await primary.close()
+        session = ReplicaSessionLocal()
+        try:
+            await session.connection()
+        except (OSError, asyncio.TimeoutError, exc.DBAPIError, exc.TimeoutError) as e:
+            await session.close()
+            replica_health.mark_failed(repr(e))
+            routing_counters["fallbacks"] += 1
+        else:
+            async with session:
+                yield session
+            return
+    yield primary
+
+
+def replica_stats() -> dict:
+    return {
+        "enabled": REPLICA_ENABLED,
+        "healthy": replica_health.healthy,
+        "failures": replica_health.failures,
+        "last_error": replica_health.last_error,
+        "last_lag_seconds": replica_health.last_lag_seconds,
+        "read_your_writes_seconds": READ_YOUR_WRITES_SECONDS,
+        "read_your_writes_pg_fanout": READ_YOUR_WRITES_PG_FANOUT,
+        "recent_writers": recent_writers.stats()["size"],
+        **routing_counters,
+    }
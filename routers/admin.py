@@ -1,10 +1,18 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select
+from typing import Optional
 
-from database import get_async_session
+from database import get_async_session, pool_stats, replica_engine
 from dependencies import get_current_admin
-from models import User, Task
+from models import User
+from pagination import paginate, build_page, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from user_cache import user_cache
+from auth_utils import hashing_pool, token_cache
+from jobs import quadrant_refresher, task_count_reconciler, tombstone_compactor
+from admission import admission_stats
+from read_routing import replica_stats
+from single_flight import single_flight_stats
 
 
 router = APIRouter(
@@ -13,33 +21,134 @@ router = APIRouter(
 )
 
 
-@router.get("/users", response_model=list[dict])
+# Ключи сортировки списка пользователей для keyset-пагинации
+USER_SORT_KEYS = {
+    "id": (User.id,),
+    "tasks_count": (User.tasks_count, User.id),
+}
+
+
+@router.get("/users", response_model=dict)
 async def list_users_with_tasks_count(
+    sort: str = Query("id", pattern="^(id|tasks_count)$"),
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     _: User = Depends(get_current_admin),
     db: AsyncSession = Depends(get_async_session)
-) -> list[dict]:
-    result = await db.execute(
-        select(
-            User.id,
-            User.nickname,
-            User.email,
-            User.role,
-            func.count(Task.id).label("tasks_count")
-        )
-        .outerjoin(Task, Task.user_id == User.id)
-        .group_by(User.id)
-        .order_by(User.id)
-    )
-    rows = result.all()
-    return [
-        {
-            "id": row.id,
-            "nickname": row.nickname,
-            "email": row.email,
-            "role": row.role.value if hasattr(row.role, "value") else str(row.role),
-            "tasks_count": row.tasks_count
-        }
-        for row in rows
-    ]
+) -> dict:
+    # tasks_count хранится в users, поэтому JOIN с tasks и GROUP BY не нужны
+    key = USER_SORT_KEYS[sort]
+    stmt = select(User.id, User.nickname, User.email, User.role, User.tasks_count)
+    result = await db.execute(paginate(stmt, key, cursor, limit, descending=order == "desc"))
+    page = build_page(result.all(), [c.key for c in key], limit)
+    return {
+        "items": [
+            {
+                "id": row.id,
+                "nickname": row.nickname,
+                "email": row.email,
+                "role": row.role.value if hasattr(row.role, "value") else str(row.role),
+                "tasks_count": row.tasks_count
+            }
+            for row in page["items"]
+        ],
+        "next_cursor": page["next_cursor"]
+    }
+
+
+@router.get("/user-cache", response_model=dict)
+async def get_user_cache_stats(
+    _: User = Depends(get_current_admin)
+) -> dict:
+    return user_cache.stats()
+
+
+@router.get("/hash-pool", response_model=dict)
+async def get_hash_pool_stats(
+    _: User = Depends(get_current_admin)
+) -> dict:
+    return hashing_pool.stats()
+
+
+@router.get("/token-cache", response_model=dict)
+async def get_token_cache_stats(
+    _: User = Depends(get_current_admin)
+) -> dict:
+    return token_cache.stats()
+
+
+@router.get("/jobs/quadrants", response_model=dict)
+async def get_quadrant_job_stats(
+    _: User = Depends(get_current_admin)
+) -> dict:
+    return quadrant_refresher.stats()
+
+
+@router.post("/jobs/quadrants/run", response_model=dict)
+async def run_quadrant_job(
+    _: User = Depends(get_current_admin)
+) -> dict:
+    await quadrant_refresher.run()
+    return quadrant_refresher.stats()
+
+
+@router.get("/db-pool", response_model=dict)
+async def get_db_pool_stats(
+    _: User = Depends(get_current_admin)
+) -> dict:
+    return pool_stats()
+
+
+@router.get("/jobs/task-counts", response_model=dict)
+async def get_task_count_job_stats(
+    _: User = Depends(get_current_admin)
+) -> dict:
+    return task_count_reconciler.stats()
+
+
+@router.post("/jobs/task-counts/run", response_model=dict)
+async def run_task_count_job(
+    _: User = Depends(get_current_admin)
+) -> dict:
+    await task_count_reconciler.run()
+    return task_count_reconciler.stats()
+
+
+@router.get("/jobs/tombstones", response_model=dict)
+async def get_tombstone_job_stats(
+    _: User = Depends(get_current_admin)
+) -> dict:
+    return tombstone_compactor.stats()
+
+
+@router.post("/jobs/tombstones/run", response_model=dict)
+async def run_tombstone_job(
+    _: User = Depends(get_current_admin)
+) -> dict:
+    await tombstone_compactor.run()
+    return tombstone_compactor.stats()
+
+
+@router.get("/admission", response_model=dict)
+async def get_admission_stats(
+    _: User = Depends(get_current_admin)
+) -> dict:
+    return admission_stats()
+
+
+@router.get("/single-flight", response_model=dict)
+async def get_single_flight_stats(
+    _: User = Depends(get_current_admin)
+) -> dict:
+    return single_flight_stats()
 
 
+@router.get("/replica", response_model=dict)
+async def get_replica_stats(
+    _: User = Depends(get_current_admin)
+) -> dict:
+    stats = replica_stats()
+    if replica_engine is not None:
+        stats["pool"] = pool_stats(replica_engine.pool)
+    return stats
@@ -1,12 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, insert, update
+from sqlalchemy.exc import IntegrityError
 from database import get_async_session
 from models import User, UserRole
 from schemas_auth import UserCreate, UserResponse, Token, ChangePasswordRequest
-from auth_utils import verify_password, get_password_hash, create_access_token
+from auth_utils import verify_password_async, get_password_hash_async, create_access_token
 from dependencies import get_current_user
+from user_cache import invalidate_user
 
 
 router = APIRouter(
@@ -15,38 +17,44 @@ router = APIRouter(
 )
 
 
+def duplicate_user_detail(error: IntegrityError) -> str:
+    """Текст ошибки по нарушенному уникальному индексу users.email / users.nickname."""
+    # asyncpg сообщает имя ограничения, SQLite — только текст ("UNIQUE constraint failed: users.email")
+    cause = getattr(error.orig, "__cause__", None)
+    name = getattr(cause, "constraint_name", None) or str(error.orig)
+    if "ix_users_email" in name or "users.email" in name:
+        return "Пользователь с таким email уже существует"
+    if "ix_users_nickname" in name or "users.nickname" in name:
+        return "Пользователь с таким никнеймом уже существует"
+    raise error
+
+
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 async def register(
     user_data: UserCreate,
     db: AsyncSession = Depends(get_async_session)
 ):
-    result = await db.execute(
-        select(User).where(User.email == user_data.email)
-    )
-    if result.scalar_one_or_none():
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Пользователь с таким email уже существует"
+    # Уникальность проверяют индексы users: один INSERT ... RETURNING вместо
+    # SELECT по email, SELECT по никнейму, INSERT и refresh; гонки регистраций исключены
+    hashed_password = await get_password_hash_async(user_data.password)
+    try:
+        new_user = await db.scalar(
+            insert(User)
+            .values(
+                nickname=user_data.nickname,
+                email=user_data.email,
+                hashed_password=hashed_password,
+                role=UserRole.USER
+            )
+            .returning(User)
         )
-
-    result = await db.execute(
-        select(User).where(User.nickname == user_data.nickname)
-    )
-    if result.scalar_one_or_none():
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Пользователь с таким никнеймом уже существует"
+            detail=duplicate_user_detail(e)
         )
-
-    new_user = User(
-        nickname=user_data.nickname,
-        email=user_data.email,
-        hashed_password=get_password_hash(user_data.password),
-        role=UserRole.USER
-    )
-    db.add(new_user)
-    await db.commit()
-    await db.refresh(new_user)
     return new_user
 
 
@@ -60,7 +68,7 @@ async def login(
     )
     user = result.scalar_one_or_none()
 
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user or not await verify_password_async(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Неверный email или пароль",
@@ -86,12 +94,22 @@ async def change_password(
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_async_session)
 ) -> dict:
-    if not verify_password(data.old_password, current_user.hashed_password):
+    # current_user приходит из кеша без хеша пароля — читаем его отдельно
+    result = await db.execute(
+        select(User.hashed_password).where(User.id == current_user.id)
+    )
+    hashed_password = result.scalar_one()
+    if not await verify_password_async(data.old_password, hashed_password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Неверный старый пароль"
         )
-    current_user.hashed_password = get_password_hash(data.new_password)
+    await db.execute(
+        update(User)
+        .where(User.id == current_user.id)
+        .values(hashed_password=await get_password_hash_async(data.new_password))
+    )
+    await invalidate_user(db, current_user.id)
     await db.commit()
     return {"message": "Пароль успешно изменен"}
 
@@ -1,67 +1,109 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from typing import List
-from datetime import datetime, timezone
-from models import Task, User, UserRole
-from database import get_async_session
-from dependencies import get_current_user
+from sqlalchemy import select, func
+from typing import List, Optional
+from datetime import datetime, timezone, timedelta
+from models import Task, User, UserRole, TaskCounter
+from dependencies import get_current_user, get_read_session
+from task_changes import TASK_COUNTERS_ENABLED, QUADRANT_COLUMNS
+from sql_functions import days_until
+from etag import check_tasks_etag, etag_headers
+from single_flight import single_flight, read_scope
 
 router = APIRouter(
     prefix="/stats",
     tags=["statistics"]
 )
 
-@router.get("/", response_model=dict)
-async def get_tasks_stats(
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_async_session)
-) -> dict:
-    stmt = select(Task)
-    if current_user.role != UserRole.ADMIN:
-        stmt = stmt.where(Task.user_id == current_user.id)
-    result = await db.execute(stmt)
-    tasks = result.scalars().all()
-    total_tasks = len(tasks)
+async def count_tasks(db: AsyncSession, user_id: Optional[int]) -> dict:
+    """Сводка по квадрантам и статусам; user_id=None — по всем пользователям."""
     by_quadrant = {"Q1": 0, "Q2": 0, "Q3": 0, "Q4": 0}
     by_status = {"completed": 0, "pending": 0}
-    for task in tasks:
-        if task.quadrant in by_quadrant:
-            by_quadrant[task.quadrant] += 1
-        if task.completed:
-            by_status["completed"] += 1
-        else:
-            by_status["pending"] += 1
+
+    if TASK_COUNTERS_ENABLED:
+        # Готовые счетчики: одна строка на пользователя
+        stmt = select(
+            *[func.coalesce(func.sum(getattr(TaskCounter, col)), 0).label(q)
+              for q, col in QUADRANT_COLUMNS.items()],
+            func.coalesce(func.sum(TaskCounter.completed), 0).label("completed")
+        )
+        if user_id is not None:
+            stmt = stmt.where(TaskCounter.user_id == user_id)
+        row = (await db.execute(stmt)).one()
+        for q in by_quadrant:
+            by_quadrant[q] = row._mapping[q]
+        total_tasks = sum(by_quadrant.values())
+        by_status["completed"] = row.completed
+        by_status["pending"] = total_tasks - row.completed
+    else:
+        # Агрегация на стороне БД: не более 8 строк вместо всех задач
+        stmt = select(
+            Task.quadrant,
+            Task.completed,
+            func.count().label("tasks_count")
+        ).group_by(Task.quadrant, Task.completed)
+        if user_id is not None:
+            stmt = stmt.where(Task.user_id == user_id)
+        result = await db.execute(stmt)
+        total_tasks = 0
+        for row in result:
+            total_tasks += row.tasks_count
+            if row.quadrant in by_quadrant:
+                by_quadrant[row.quadrant] += row.tasks_count
+            by_status["completed" if row.completed else "pending"] += row.tasks_count
+
     return {
         "total_tasks": total_tasks,
         "by_quadrant": by_quadrant,
         "by_status": by_status
     }
 
+@router.get("/", response_model=dict)
+async def get_tasks_stats(
+    response: Response,
+    etag: str = Depends(check_tasks_etag),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_session)
+) -> dict:
+    # Дашборд в нескольких вкладках: одновременные одинаковые запросы делят один запрос к БД
+    user_id = read_scope(current_user)
+    stats = await single_flight.do("stats.summary", (user_id, etag), lambda: count_tasks(db, user_id))
+    response.headers.update(etag_headers(etag))
+    return stats
+
 @router.get("/deadlines", response_model=List[dict])
 async def get_deadlines_stats(
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    within_days: Optional[int] = Query(
+        None,
+        ge=0,
+        description="Только задачи с дедлайном в ближайшие N дней"
+    ),
+    etag: str = Depends(check_tasks_etag),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_async_session)
+    db: AsyncSession = Depends(get_read_session)
 ) -> List[dict]:
-    stmt = select(Task).where(Task.completed == False)
+    now = datetime.now(timezone.utc)
+    # days_left считается в БД; порядок по ближайшему дедлайну обслуживает
+    # индекс (user_id, completed, deadline_at)
+    stmt = select(
+        Task.title,
+        Task.description,
+        Task.created_at,
+        days_until(Task.deadline_at, now).label("days_left")
+    ).where(Task.completed == False)
     if current_user.role != UserRole.ADMIN:
         stmt = stmt.where(Task.user_id == current_user.id)
-    result = await db.execute(stmt)
-    tasks = result.scalars().all()
-    
-    now = datetime.now(timezone.utc)
-    stats = []
-    for task in tasks:
-        deadline = task.deadline_at
-        if deadline.tzinfo is None:
-            deadline = deadline.replace(tzinfo=timezone.utc)
-        
-        days_left = (deadline - now).days
-        
-        stats.append({
-            "title": task.title,
-            "description": task.description,
-            "created_at": task.created_at,
-            "days_left": days_left
-        })
-    return stats
+    if within_days is not None:
+        stmt = stmt.where(Task.deadline_at < now + timedelta(days=within_days))
+    stmt = stmt.order_by(Task.deadline_at, Task.id).limit(limit)
+
+    async def fetch() -> List[dict]:
+        return [row._asdict() for row in await db.execute(stmt)]
+
+    deadlines = await single_flight.do(
+        "stats.deadlines", (read_scope(current_user), limit, within_days, etag), fetch
+    )
+    response.headers.update(etag_headers(etag))
+    return deadlines
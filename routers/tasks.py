@@ -1,141 +1,520 @@
-from fastapi import APIRouter, HTTPException, Depends, status, Query
+from fastapi import APIRouter, HTTPException, Depends, status, Query, Body, UploadFile, File, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from typing import List
+from sqlalchemy import select, insert, update, delete, values, column, cast, type_coerce, and_, func, case
+from sqlalchemy import Integer, Text, Boolean, DateTime
+from typing import Optional, List, Any
 from datetime import datetime, timezone, timedelta
 
-from schemas import TaskCreate, TaskResponse, TaskUpdate
+from schemas import (
+    TaskCreate, TaskResponse, TaskUpdate, TaskPage, TaskBulkUpdateItem,
+    TaskIds, TaskBulkResult, TaskBulkDeleteResult, TaskChanges, BULK_MAX_ITEMS, validation_detail
+)
 from models import Task, UserRole
 from database import get_async_session
-from dependencies import get_current_user
+from dependencies import get_current_user, get_read_session
 from models import User
+from task_changes import TaskChangeSet, TASK_COUNTERS_ENABLED
+from task_search import search_task_page
+from pagination import paginate, build_page, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from serialization import TASK_RESPONSE_COLUMNS, task_page_response, task_changes_response
+from task_export import export_tasks, MEDIA_TYPES
+from task_quadrants import calculate_quadrant, quadrant_expression, quadrant_case
+from task_import import import_tasks
+from etag import check_tasks_etag, etag_headers
+from read_routing import choose_sessionmaker
+from single_flight import single_flight, read_scope
+from task_events import task_event_broker, event_stream
+from task_sync import fetch_changes
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 
-def calculate_quadrant(is_important: bool, deadline_at: datetime) -> str:
-    now = datetime.now(timezone.utc)
-    if deadline_at.tzinfo is None:
-        deadline_at = deadline_at.replace(tzinfo=timezone.utc)
-    
-    # Срочно, если до дедлайна <= 3 дней
-    is_urgent = (deadline_at - now) <= timedelta(days=3)
-    
-    if is_important and is_urgent:
-        return "Q1"
-    elif is_important and not is_urgent:
-        return "Q2"
-    elif not is_important and is_urgent:
-        return "Q3"
-    else:
-        return "Q4"
+# Ключи сортировки для keyset-пагинации: (created_at, id) и (deadline_at, id)
+CREATED_KEY = (Task.created_at, Task.id)
+DEADLINE_KEY = (Task.deadline_at, Task.id)
+
+
+async def fetch_page(
+    db: AsyncSession,
+    stmt,
+    key: tuple,
+    cursor: Optional[str],
+    limit: int
+) -> dict:
+    result = await db.execute(paginate(stmt, key, cursor, limit))
+    rows = result.all()
+    return build_page(rows, [c.key for c in key], limit)
 
 # GET ALL TASKS - Получить все задачи
-@router.get("", response_model=List[TaskResponse])
+@router.get("", response_model=TaskPage)
 async def get_all_tasks(
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    etag: str = Depends(check_tasks_etag),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_async_session)
-) -> List[TaskResponse]:
-    stmt = select(Task)
+    db: AsyncSession = Depends(get_read_session)
+) -> TaskPage:
+    stmt = select(*TASK_RESPONSE_COLUMNS)
     if current_user.role != UserRole.ADMIN:
         stmt = stmt.where(Task.user_id == current_user.id)
-    result = await db.execute(stmt)
-    tasks = result.scalars().all()
-    return tasks
+    # Одинаковые одновременные запросы (несколько вкладок) делят один запрос к БД;
+    # ETag в ключе — запросы после записи не получат результат, начатый до нее
+    page = await single_flight.do(
+        "tasks.list", (read_scope(current_user), cursor, limit, etag),
+        lambda: fetch_page(db, stmt, CREATED_KEY, cursor, limit)
+    )
+    return task_page_response(page, headers=etag_headers(etag))
 
 # SEARCH TASKS - Поиск задач
-@router.get("/search", response_model=List[TaskResponse])
+@router.get("/search", response_model=TaskPage)
 async def search_tasks(
     q: str = Query(..., min_length=2),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    etag: str = Depends(check_tasks_etag),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_async_session)
-) -> List[TaskResponse]:
-    keyword = f"%{q.lower()}%"
-    stmt = select(Task).where(
-        (Task.title.ilike(keyword)) |
-        (Task.description.ilike(keyword))
+    db: AsyncSession = Depends(get_read_session)
+) -> TaskPage:
+    # Результаты отсортированы по релевантности, курсор — (rank, id)
+    q = q.strip()
+    if len(q) < 2:
+        # Запрос из одних пробелов совпал бы с любой задачей
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Поисковый запрос должен содержать минимум 2 символа без учета пробелов"
+        )
+    user_id = read_scope(current_user)
+    page = await single_flight.do(
+        "tasks.search", (user_id, q, cursor, limit, etag),
+        lambda: search_task_page(db, q, user_id, cursor, limit)
     )
-    if current_user.role != UserRole.ADMIN:
-        stmt = stmt.where(Task.user_id == current_user.id)
-    result = await db.execute(stmt)
-    tasks = result.scalars().all()
-    if not tasks:
+    if not page["items"] and cursor is None:
         raise HTTPException(status_code=404, detail="По данному запросу ничего не найдено")
-    return tasks
+    return task_page_response(page, headers=etag_headers(etag))
 
 # GET TASKS BY STATUS - Получить задачи по статусу
-@router.get("/status/{status}", response_model=List[TaskResponse])
+@router.get("/status/{status}", response_model=TaskPage)
 async def get_tasks_by_status(
     status: str,
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    etag: str = Depends(check_tasks_etag),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_async_session)
-) -> List[TaskResponse]:
+    db: AsyncSession = Depends(get_read_session)
+) -> TaskPage:
     if status not in ["completed", "pending"]:
         raise HTTPException(
             status_code=404,
             detail="Недопустимый статус. Используйте: completed или pending"
         )
     is_completed = (status == "completed")
-    stmt = select(Task).where(Task.completed == is_completed)
+    stmt = select(*TASK_RESPONSE_COLUMNS).where(Task.completed == is_completed)
     if current_user.role != UserRole.ADMIN:
         stmt = stmt.where(Task.user_id == current_user.id)
-    result = await db.execute(stmt)
-    tasks = result.scalars().all()
-    return tasks
+    page = await single_flight.do(
+        "tasks.status", (read_scope(current_user), status, cursor, limit, etag),
+        lambda: fetch_page(db, stmt, CREATED_KEY, cursor, limit)
+    )
+    return task_page_response(page, headers=etag_headers(etag))
 
 # GET TASKS BY QUADRANT - Получить задачи по квадранту
-@router.get("/quadrant/{quadrant}", response_model=List[TaskResponse])
+@router.get("/quadrant/{quadrant}", response_model=TaskPage)
 async def get_tasks_by_quadrant(
     quadrant: str,
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    etag: str = Depends(check_tasks_etag),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_async_session)
-) -> List[TaskResponse]:
+    db: AsyncSession = Depends(get_read_session)
+) -> TaskPage:
     if quadrant not in ["Q1", "Q2", "Q3", "Q4"]:
         raise HTTPException(
             status_code=400,
             detail="Неверный квадрант. Используйте: Q1, Q2, Q3, Q4"
         )
-    stmt = select(Task).where(Task.quadrant == quadrant)
+    stmt = select(*TASK_RESPONSE_COLUMNS).where(Task.quadrant == quadrant)
     if current_user.role != UserRole.ADMIN:
         stmt = stmt.where(Task.user_id == current_user.id)
-    result = await db.execute(stmt)
-    tasks = result.scalars().all()
-    return tasks
+    page = await single_flight.do(
+        "tasks.quadrant", (read_scope(current_user), quadrant, cursor, limit, etag),
+        lambda: fetch_page(db, stmt, CREATED_KEY, cursor, limit)
+    )
+    return task_page_response(page, headers=etag_headers(etag))
 
 # GET TASKS DUE TODAY - Получить задачи, срок которых истекает сегодня
-@router.get("/today", response_model=List[TaskResponse])
+@router.get("/today", response_model=TaskPage)
 async def get_tasks_due_today(
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    etag: str = Depends(check_tasks_etag),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_async_session)
-) -> List[TaskResponse]:
+    db: AsyncSession = Depends(get_read_session)
+) -> TaskPage:
     now = datetime.now(timezone.utc)
     start_of_day = now.replace(hour=0, minute=0, second=0, microsecond=0)
     end_of_day = start_of_day + timedelta(days=1)
 
-    stmt = select(Task).where(
+    stmt = select(*TASK_RESPONSE_COLUMNS).where(
         Task.deadline_at >= start_of_day,
         Task.deadline_at < end_of_day
     )
     if current_user.role != UserRole.ADMIN:
         stmt = stmt.where(Task.user_id == current_user.id)
 
-    result = await db.execute(stmt)
-    tasks = result.scalars().all()
-    return tasks
+    # Границы дня входят в ключ: в полночь запросы перестают объединяться со вчерашними
+    page = await single_flight.do(
+        "tasks.today", (read_scope(current_user), start_of_day, cursor, limit, etag),
+        lambda: fetch_page(db, stmt, DEADLINE_KEY, cursor, limit)
+    )
+    return task_page_response(page, headers=etag_headers(etag))
+
+# EXPORT TASKS - Потоковая выгрузка задач (NDJSON или CSV)
+@router.get("/export")
+async def export_tasks_stream(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session)
+) -> StreamingResponse:
+    user_id = None if current_user.role == UserRole.ADMIN else current_user.id
+    # Выгрузка открывает свою сессию, а сессия аутентификации иначе держала бы соединение
+    # до конца потока: возвращаем его в пул сразу
+    await db.close()
+    return StreamingResponse(
+        export_tasks(format, user_id, choose_sessionmaker(current_user)),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="tasks.{format}"'}
+    )
+
+# TASK CHANGES - Дельта-синхронизация: изменения после водяного знака
+@router.get("/changes", response_model=TaskChanges)
+async def get_task_changes(
+    since: Optional[str] = Query(None, description="Водяной знак из предыдущего ответа"),
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: User = Depends(get_current_user),
+    # Основная БД, а не реплика: отставание реплики не должно сдвигать водяной знак мимо изменений
+    db: AsyncSession = Depends(get_async_session)
+) -> TaskChanges:
+    changes = await fetch_changes(db, read_scope(current_user), since, limit)
+    return task_changes_response(changes)
+
+# TASK EVENTS - Поток изменений задач (Server-Sent Events)
+@router.get("/events")
+async def task_events_stream(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session)
+) -> StreamingResponse:
+    subscription = task_event_broker.subscribe(current_user)
+    if subscription is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Слишком много подписок на события, повторите позже",
+            headers={"Retry-After": "5"}
+        )
+    # Сессия аутентификации живет до конца потока: соединение возвращаем в пул сразу
+    await db.close()
+    return StreamingResponse(
+        event_stream(subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# IMPORT TASKS - Загрузка задач из файла NDJSON или CSV (COPY пачками)
+@router.post("/import")
+async def import_tasks_file(
+    file: UploadFile = File(...),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    user_id: Optional[int] = Query(None, description="Владелец задач (только для ADMIN)"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session)
+) -> dict:
+    if user_id is None:
+        user_id = current_user.id
+    elif user_id != current_user.id:
+        if current_user.role != UserRole.ADMIN:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Импорт задач другому пользователю доступен только администратору"
+            )
+        if await db.get(User, user_id) is None:
+            raise HTTPException(status_code=404, detail="Пользователь не найден")
+
+    report = await import_tasks(db, file.file, format, user_id)
+    return report.as_dict()
+
+# Пакетные операции: один запрос и одна транзакция на весь пакет.
+# Объявлены до /{task_id}, иначе "bulk" совпадет с путем задачи
+
+def split_duplicates(ids: List[int]) -> tuple:
+    """Возвращает ({id: позиция в запросе}, ошибки для повторов)."""
+    positions, errors = {}, []
+    for index, task_id in enumerate(ids):
+        if task_id in positions:
+            errors.append({"index": index, "id": task_id, "detail": "Повторяющийся идентификатор"})
+        else:
+            positions[task_id] = index
+    return positions, errors
+
+
+def not_found_errors(positions: dict, found: set) -> list:
+    return [
+        {"index": index, "id": task_id, "detail": "Задача не найдена"}
+        for task_id, index in positions.items()
+        if task_id not in found
+    ]
+
+
+async def update_tasks_returning(db: AsyncSession, criteria: list, values: dict) -> list:
+    """
+    UPDATE ... RETURNING по условию (условие может ссылаться и на другие источники,
+    например VALUES пакета). Возвращает [(task, old_quadrant, old_completed)].
+    Старые значения нужны только счетчикам: в PostgreSQL они берутся тем же запросом
+    из снимка строк (UPDATE ... FROM), иначе — предварительным SELECT ... FOR UPDATE.
+    Без счетчиков старыми считаются новые значения.
+    """
+    if not TASK_COUNTERS_ENABLED:
+        result = await db.execute(
+            update(Task).where(*criteria).values(**values)
+            .returning(Task)
+            .execution_options(synchronize_session=False)
+        )
+        return [(task, task.quadrant, task.completed) for task in result.scalars()]
+
+    if db.bind.dialect.name == "postgresql":
+        old = (
+            select(Task.id, Task.quadrant, Task.completed)
+            .where(*criteria)
+            .with_for_update(of=Task)
+            .subquery("old")
+        )
+        result = await db.execute(
+            update(Task).where(Task.id == old.c.id, *criteria).values(**values)
+            .returning(Task, old.c.quadrant.label("old_quadrant"), old.c.completed.label("old_completed"))
+            .execution_options(synchronize_session=False)
+        )
+        return [(row.Task, row.old_quadrant, row.old_completed) for row in result]
+
+    result = await db.execute(
+        select(Task.id, Task.quadrant, Task.completed).where(*criteria).with_for_update()
+    )
+    old = {row.id: row for row in result}
+    if not old:
+        return []
+    result = await db.execute(
+        update(Task).where(Task.id.in_(old), *criteria).values(**values)
+        .returning(Task)
+        .execution_options(synchronize_session=False)
+    )
+    return [
+        (task, old[task.id].quadrant, old[task.id].completed)
+        for task in result.scalars()
+    ]
+
+
+# POST BULK - Создание пакета задач
+@router.post("/bulk", response_model=TaskBulkResult)
+async def create_tasks_bulk(
+    items: List[Any] = Body(..., min_length=1, max_length=BULK_MAX_ITEMS),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session)
+) -> TaskBulkResult:
+    now = datetime.now(timezone.utc)
+    errors, values = [], []
+    for index, item in enumerate(items):
+        try:
+            task = TaskCreate.model_validate(item)
+        except ValidationError as e:
+            errors.append({"index": index, "id": None, "detail": validation_detail(e)})
+            continue
+        values.append({
+            "title": task.title,
+            "description": task.description,
+            "is_important": task.is_important,
+            "deadline_at": task.deadline_at,
+            "user_id": current_user.id,
+            "quadrant": calculate_quadrant(task.is_important, task.deadline_at, now),
+            "completed": False
+        })
+
+    created = []
+    if values:
+        # Многострочный INSERT ... RETURNING, порядок строк совпадает с порядком values
+        result = await db.scalars(
+            insert(Task).returning(Task, sort_by_parameter_order=True),
+            values
+        )
+        created = result.all()
+        changes = TaskChangeSet()
+        for task in created:
+            changes.added(task.user_id, task.quadrant, task.completed)
+            changes.event("created", task.user_id, task.id, task)
+        await changes.apply(db)
+        await db.commit()
+    return {"items": created, "errors": errors}
+
+# PATCH BULK COMPLETE - Отметить пакет задач выполненными
+@router.patch("/bulk/complete", response_model=TaskBulkResult)
+async def complete_tasks_bulk(
+    payload: TaskIds,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session)
+) -> TaskBulkResult:
+    positions, errors = split_duplicates(payload.ids)
+    criteria = [Task.id.in_(positions)]
+    if current_user.role != UserRole.ADMIN:
+        criteria.append(Task.user_id == current_user.id)
+    rows = await update_tasks_returning(
+        db,
+        criteria,
+        {"completed": True, "completed_at": datetime.now(timezone.utc)}
+    )
+
+    changes = TaskChangeSet()
+    for task, old_quadrant, old_completed in rows:
+        changes.changed(task.user_id, old_quadrant, old_completed, task.quadrant, task.completed)
+        changes.event("completed", task.user_id, task.id, task)
+    await changes.apply(db)
+    await db.commit()
+
+    errors += not_found_errors(positions, {task.id for task, _, _ in rows})
+    errors.sort(key=lambda e: e["index"])
+    return {"items": [task for task, _, _ in rows], "errors": errors}
+
+def bulk_update_values(db: AsyncSession, updates: dict, current_user: User) -> tuple:
+    """
+    Условие и SET для пакетного UPDATE: изменения всех задач — одна таблица VALUES
+    (id и новые значения; NULL — поле не меняется). Описание можно сбросить в NULL,
+    поэтому для него отдельный признак. Квадрант пересчитывается в том же UPDATE,
+    только если изменились важность или дедлайн.
+    """
+    source = values(
+        column("id", Integer),
+        column("title", Text),
+        column("description", Text),
+        column("set_description", Boolean),
+        column("is_important", Boolean),
+        column("deadline_at", DateTime(timezone=True)),
+        column("completed", Boolean),
+        name="changes"
+    ).data([
+        (
+            task_id,
+            data.get("title"),
+            data.get("description"),
+            "description" in data,
+            data.get("is_important"),
+            data.get("deadline_at"),
+            data.get("completed"),
+        )
+        for task_id, data in updates.items()
+    ]).cte("changes")
+
+    # Колонка VALUES из одних NULL в PostgreSQL получает тип text — приводим явно.
+    # В SQLite CAST к DATETIME испортил бы строку времени, там тип нужен только SQLAlchemy
+    convert = cast if db.bind.dialect.name == "postgresql" else type_coerce
+    c = source.c
+    is_important = func.coalesce(convert(c.is_important, Boolean), Task.is_important)
+    deadline_at = func.coalesce(convert(c.deadline_at, DateTime(timezone=True)), Task.deadline_at)
+    new_values = {
+        "title": func.coalesce(convert(c.title, Text), Task.title),
+        "description": case((c.set_description, convert(c.description, Text)), else_=Task.description),
+        "is_important": is_important,
+        "deadline_at": deadline_at,
+        "completed": func.coalesce(convert(c.completed, Boolean), Task.completed),
+        "quadrant": case(
+            (and_(c.is_important.is_(None), c.deadline_at.is_(None)), Task.quadrant),
+            else_=quadrant_case(is_important, deadline_at, datetime.now(timezone.utc))
+        ),
+    }
+    criteria = [Task.id == c.id]
+    if current_user.role != UserRole.ADMIN:
+        criteria.append(Task.user_id == current_user.id)
+    return criteria, new_values
+
+# PATCH BULK - Обновление пакета задач
+@router.patch("/bulk", response_model=TaskBulkResult)
+async def update_tasks_bulk(
+    items: List[Any] = Body(..., min_length=1, max_length=BULK_MAX_ITEMS),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session)
+) -> TaskBulkResult:
+    errors, updates, positions = [], {}, {}
+    for index, item in enumerate(items):
+        try:
+            task_update = TaskBulkUpdateItem.model_validate(item)
+        except ValidationError as e:
+            errors.append({"index": index, "id": None, "detail": validation_detail(e)})
+            continue
+        if task_update.id in updates:
+            errors.append({"index": index, "id": task_update.id, "detail": "Повторяющийся идентификатор"})
+            continue
+        updates[task_update.id] = task_update.model_dump(exclude_unset=True, exclude={"id"})
+        positions[task_update.id] = index
+
+    tasks = []
+    if updates:
+        # Один UPDATE ... FROM (VALUES ...) ... RETURNING на весь пакет
+        rows = await update_tasks_returning(db, *bulk_update_values(db, updates, current_user))
+        changes = TaskChangeSet()
+        for task, old_quadrant, old_completed in rows:
+            changes.changed(task.user_id, old_quadrant, old_completed, task.quadrant, task.completed)
+            changes.event("updated", task.user_id, task.id, task)
+        await changes.apply(db)
+        await db.commit()
+        tasks = [task for task, _, _ in rows]
+
+    errors += not_found_errors(positions, {task.id for task in tasks})
+    errors.sort(key=lambda e: e["index"])
+    return {"items": tasks, "errors": errors}
+
+# DELETE BULK - Удаление пакета задач
+@router.delete("/bulk", response_model=TaskBulkDeleteResult)
+async def delete_tasks_bulk(
+    payload: TaskIds,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session)
+) -> TaskBulkDeleteResult:
+    positions, errors = split_duplicates(payload.ids)
+    stmt = delete(Task).where(Task.id.in_(positions))
+    if current_user.role != UserRole.ADMIN:
+        stmt = stmt.where(Task.user_id == current_user.id)
+    result = await db.execute(
+        stmt.returning(Task.id, Task.user_id, Task.quadrant, Task.completed)
+        .execution_options(synchronize_session=False)
+    )
+    rows = result.all()
+
+    changes = TaskChangeSet()
+    for row in rows:
+        changes.removed(row.user_id, row.quadrant, row.completed)
+        changes.event("deleted", row.user_id, row.id)
+    await changes.apply(db)
+    await db.commit()
+
+    deleted = [row.id for row in rows]
+    errors += not_found_errors(positions, set(deleted))
+    errors.sort(key=lambda e: e["index"])
+    return {"deleted": deleted, "errors": errors}
 
 # GET TASK BY ID - Получить задачу по ID
 @router.get("/{task_id}", response_model=TaskResponse)
 async def get_task_by_id(
     task_id: int,
+    response: Response,
+    etag: str = Depends(check_tasks_etag),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_async_session)
+    db: AsyncSession = Depends(get_read_session)
 ) -> TaskResponse:
     stmt = select(Task).where(Task.id == task_id)
     if current_user.role != UserRole.ADMIN:
         stmt = stmt.where(Task.user_id == current_user.id)
-    result = await db.execute(stmt)
-    task = result.scalar_one_or_none()
+    task = await single_flight.do(
+        "tasks.get", (read_scope(current_user), task_id, etag),
+        lambda: db.scalar(stmt)
+    )
     if not task:
         raise HTTPException(status_code=404, detail="Задача не найдена")
+    response.headers.update(etag_headers(etag))
     return task
 
 # POST - СОЗДАНИЕ НОВОЙ ЗАДАЧИ
@@ -147,18 +526,23 @@ async def create_task(
 ) -> TaskResponse:
     quadrant = calculate_quadrant(task.is_important, task.deadline_at)
 
-    new_task = Task(
-        title=task.title,
-        description=task.description,
-        is_important=task.is_important,
-        deadline_at=task.deadline_at,
-        user_id=current_user.id,
-        quadrant=quadrant,
-        completed=False
+    # INSERT ... RETURNING сразу отдает id и created_at: без refresh после commit
+    new_task = await db.scalar(
+        insert(Task).values(
+            title=task.title,
+            description=task.description,
+            is_important=task.is_important,
+            deadline_at=task.deadline_at,
+            user_id=current_user.id,
+            quadrant=quadrant,
+            completed=False
+        ).returning(Task)
     )
-    db.add(new_task)
+    changes = TaskChangeSet()
+    changes.added(current_user.id, quadrant, False)
+    changes.event("created", new_task.user_id, new_task.id, new_task)
+    await changes.apply(db)
     await db.commit()
-    await db.refresh(new_task)
     return new_task
 
 # PUT - ОБНОВЛЕНИЕ ЗАДАЧИ
@@ -169,24 +553,35 @@ async def update_task(
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_async_session)
 ) -> TaskResponse:
-    stmt = select(Task).where(Task.id == task_id)
+    criteria = [Task.id == task_id]
     if current_user.role != UserRole.ADMIN:
-        stmt = stmt.where(Task.user_id == current_user.id)
-    result = await db.execute(stmt)
-    task = result.scalar_one_or_none()
-    if not task:
-        raise HTTPException(status_code=404, detail="Задача не найдена")
+        criteria.append(Task.user_id == current_user.id)
 
     update_data = task_update.model_dump(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(task, field, value)
+    if not update_data:
+        task = (await db.execute(select(Task).where(*criteria))).scalar_one_or_none()
+        if not task:
+            raise HTTPException(status_code=404, detail="Задача не найдена")
+        return task
 
-    # Пересчитываем квадрант при изменении важности или дедлайна
+    # Пересчитываем квадрант при изменении важности или дедлайна — прямо в UPDATE
     if "is_important" in update_data or "deadline_at" in update_data:
-        task.quadrant = calculate_quadrant(task.is_important, task.deadline_at)
+        update_data["quadrant"] = quadrant_expression(
+            update_data.get("is_important"),
+            update_data.get("deadline_at")
+        )
+
+    # Один UPDATE ... RETURNING с фильтром по владельцу вместо SELECT + commit + refresh
+    rows = await update_tasks_returning(db, criteria, update_data)
+    if not rows:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+    task, old_quadrant, old_completed = rows[0]
 
+    changes = TaskChangeSet()
+    changes.changed(task.user_id, old_quadrant, old_completed, task.quadrant, task.completed)
+    changes.event("updated", task.user_id, task.id, task)
+    await changes.apply(db)
     await db.commit()
-    await db.refresh(task)
     return task
 
 # PATCH - ОТМЕТИТЬ ЗАДАЧУ ВЫПОЛНЕННОЙ
@@ -196,18 +591,23 @@ async def complete_task(
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_async_session)
 ) -> TaskResponse:
-    stmt = select(Task).where(Task.id == task_id)
+    criteria = [Task.id == task_id]
     if current_user.role != UserRole.ADMIN:
-        stmt = stmt.where(Task.user_id == current_user.id)
-    result = await db.execute(stmt)
-    task = result.scalar_one_or_none()
-    if not task:
+        criteria.append(Task.user_id == current_user.id)
+    rows = await update_tasks_returning(
+        db,
+        criteria,
+        {"completed": True, "completed_at": datetime.now(timezone.utc)}
+    )
+    if not rows:
         raise HTTPException(status_code=404, detail="Задача не найдена")
+    task, old_quadrant, old_completed = rows[0]
 
-    task.completed = True
-    task.completed_at = datetime.now(timezone.utc)
+    changes = TaskChangeSet()
+    changes.changed(task.user_id, old_quadrant, old_completed, task.quadrant, True)
+    changes.event("completed", task.user_id, task.id, task)
+    await changes.apply(db)
     await db.commit()
-    await db.refresh(task)
     return task
 
 # DELETE - УДАЛЕНИЕ ЗАДАЧИ
@@ -217,22 +617,25 @@ async def delete_task(
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_async_session)
 ) -> dict:
-    stmt = select(Task).where(Task.id == task_id)
+    stmt = delete(Task).where(Task.id == task_id)
     if current_user.role != UserRole.ADMIN:
         stmt = stmt.where(Task.user_id == current_user.id)
-    result = await db.execute(stmt)
-    task = result.scalar_one_or_none()
-    if not task:
+    # DELETE ... RETURNING сразу отдает удаленную строку, отдельный SELECT не нужен
+    result = await db.execute(
+        stmt.returning(Task.id, Task.title, Task.user_id, Task.quadrant, Task.completed)
+        .execution_options(synchronize_session=False)
+    )
+    deleted = result.one_or_none()
+    if not deleted:
         raise HTTPException(status_code=404, detail="Задача не найдена")
 
-    deleted_task_info = {
-        "id": task.id,
-        "title": task.title
-    }
-    await db.delete(task)
+    changes = TaskChangeSet()
+    changes.removed(deleted.user_id, deleted.quadrant, deleted.completed)
+    changes.event("deleted", deleted.user_id, deleted.id)
+    await changes.apply(db)
     await db.commit()
     return {
         "message": "Задача успешно удалена",
-        "id": deleted_task_info["id"],
-        "title": deleted_task_info["title"]
+        "id": deleted.id,
+        "title": deleted.title
     }
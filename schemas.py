@@ -1,6 +1,6 @@
 # Pydantic модели
-from pydantic import BaseModel, Field, computed_field
-from typing import Optional
+from pydantic import BaseModel, Field, computed_field, ValidationError
+from typing import Optional, List, Any
 from datetime import datetime, timezone
 
 
@@ -90,3 +90,98 @@ class TaskResponse(TaskBase):
 
     class Config:
         from_attributes = True
+
+
+class TaskPage(BaseModel):
+    items: List[TaskResponse] = Field(
+        ...,
+        description="Задачи текущей страницы"
+    )
+    next_cursor: Optional[str] = Field(
+        None,
+        description="Курсор следующей страницы (null, если страница последняя)"
+    )
+
+
+class TaskChanges(BaseModel):
+    items: List[TaskResponse] = Field(
+        ...,
+        description="Созданные и измененные задачи"
+    )
+    deleted: List[int] = Field(
+        ...,
+        description="Идентификаторы удаленных задач"
+    )
+    watermark: str = Field(
+        ...,
+        description="Водяной знак для следующего запроса (since)"
+    )
+    has_more: bool = Field(
+        ...,
+        description="Есть еще изменения: повторите запрос с новым водяным знаком"
+    )
+
+
+# Пакетные операции над задачами
+BULK_MAX_ITEMS = 1000
+
+
+def validation_detail(error: ValidationError) -> list:
+    """Ошибки pydantic в JSON-совместимом виде для отчетов по отдельным элементам."""
+    return [
+        {"loc": list(e["loc"]), "msg": e["msg"], "type": e["type"]}
+        for e in error.errors()
+    ]
+
+
+class TaskBulkUpdateItem(TaskUpdate):
+    id: int = Field(
+        ...,
+        description="Идентификатор обновляемой задачи"
+    )
+
+
+class TaskIds(BaseModel):
+    ids: List[int] = Field(
+        ...,
+        min_length=1,
+        max_length=BULK_MAX_ITEMS,
+        description="Идентификаторы задач"
+    )
+
+
+class BulkItemError(BaseModel):
+    index: int = Field(
+        ...,
+        description="Позиция элемента в запросе"
+    )
+    id: Optional[int] = Field(
+        None,
+        description="Идентификатор задачи, если он известен"
+    )
+    detail: Any = Field(
+        ...,
+        description="Причина ошибки"
+    )
+
+
+class TaskBulkResult(BaseModel):
+    items: List[TaskResponse] = Field(
+        ...,
+        description="Успешно обработанные задачи"
+    )
+    errors: List[BulkItemError] = Field(
+        ...,
+        description="Ошибки по отдельным элементам"
+    )
+
+
+class TaskBulkDeleteResult(BaseModel):
+    deleted: List[int] = Field(
+        ...,
+        description="Идентификаторы удаленных задач"
+    )
+    errors: List[BulkItemError] = Field(
+        ...,
+        description="Ошибки по отдельным элементам"
+    )
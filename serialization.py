@@ -0,0 +1,71 @@
+from datetime import datetime, timezone
+from typing import Any, Iterable, Optional
+
+import orjson
+from fastapi.responses import JSONResponse
+
+from models import Task
+
+# Колонки TaskResponse в порядке полей схемы: списки выбирают их как Core-строки,
+# без создания ORM-объектов
+TASK_RESPONSE_COLUMNS = (
+    Task.title,
+    Task.description,
+    Task.is_important,
+    Task.deadline_at,
+    Task.id,
+    Task.quadrant,
+    Task.completed,
+    Task.created_at,
+)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON через orjson. Вывод побайтно совпадает со стандартным ответом FastAPI:
+    компактные разделители, UTF-8 без экранирования, даты в ISO 8601 с "Z" для UTC.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+
+
+def task_to_dict(task: Any, now: datetime) -> dict:
+    """Строка или ORM-объект задачи -> dict в формате TaskResponse (включая days_left)."""
+    deadline = task.deadline_at
+    if deadline.tzinfo is None:
+        deadline = deadline.replace(tzinfo=timezone.utc)
+    return {
+        "title": task.title,
+        "description": task.description,
+        "is_important": task.is_important,
+        "deadline_at": task.deadline_at,
+        "id": task.id,
+        "quadrant": task.quadrant,
+        "completed": task.completed,
+        "created_at": task.created_at,
+        "days_left": (deadline - now).days,
+    }
+
+
+def task_page_content(items: Iterable[Any], next_cursor: Optional[str]) -> dict:
+    # now вычисляется один раз на ответ, а не для каждой строки
+    now = datetime.now(timezone.utc)
+    return {
+        "items": [task_to_dict(task, now) for task in items],
+        "next_cursor": next_cursor,
+    }
+
+
+def task_page_response(page: dict, headers: Optional[dict] = None) -> FastJSONResponse:
+    return FastJSONResponse(task_page_content(page["items"], page["next_cursor"]), headers=headers)
+
+
+def task_changes_response(changes: dict) -> FastJSONResponse:
+    now = datetime.now(timezone.utc)
+    return FastJSONResponse({
+        "items": [task_to_dict(task, now) for task in changes["items"]],
+        "deleted": changes["deleted"],
+        "watermark": changes["watermark"],
+        "has_more": changes["has_more"],
+    })
@@ -0,0 +1,99 @@
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from dotenv import load_dotenv
+
+from models import User, UserRole
+
+load_dotenv()
+
+SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() in ("1", "true", "yes")
+
+
+class SingleFlight:
+    """
+    Объединение одинаковых одновременных чтений: пока запрос с ключом выполняется,
+    остальные с тем же ключом ждут его результат (или исключение), а не идут в БД.
+    Кеша нет: после завершения запроса следующий выполняется заново.
+    Рассчитан на использование из одного event loop, поэтому без блокировок.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, name: str, counter: str) -> None:
+        counters = self._counters.get(name)
+        if counters is None:
+            counters = self._counters[name] = {"executed": 0, "coalesced": 0, "errors": 0, "retried": 0}
+        counters[counter] += 1
+
+    async def do(self, name: str, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        name — эндпоинт (метка в метриках); key — все, от чего зависит результат.
+        Результат общий для всех ожидающих, поэтому его нельзя изменять.
+        """
+        if not self.enabled:
+            return await fn()
+        call_key = (name, key)
+        future = self._calls.get(call_key)
+        if future is not None:
+            try:
+                # shield: отмена ожидающего запроса не отменяет общий
+                result = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # Ведущий запрос отменен (клиент отключился) — выполняем сами
+                self._count(name, "retried")
+                return await fn()
+            self._count(name, "coalesced")
+            return result
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[call_key] = future
+        self._count(name, "executed")
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            self._count(name, "errors")
+            future.set_exception(e)
+            # Исключение получают ожидающие; без них asyncio не должен ругаться на непрочитанное
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[call_key]
+
+    def stats(self) -> Dict[str, dict]:
+        result = {}
+        for name, counters in self._counters.items():
+            total = counters["executed"] + counters["coalesced"]
+            result[name] = {
+                **counters,
+                "coalesced_ratio": round(counters["coalesced"] / total, 4) if total else 0.0,
+            }
+        return result
+
+
+single_flight = SingleFlight(enabled=SINGLE_FLIGHT_ENABLED)
+
+
+def read_scope(user: User) -> Optional[int]:
+    # ADMIN читает задачи всех пользователей: результат общий для всех администраторов
+    return None if user.role == UserRole.ADMIN else user.id
+
+
+def single_flight_stats() -> dict:
+    return {
+        "enabled": single_flight.enabled,
+        "in_flight": len(single_flight._calls),
+        "endpoints": single_flight.stats(),
+    }
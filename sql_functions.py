@@ -0,0 +1,54 @@
+from sqlalchemy import Integer, DateTime
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+
+class days_until(FunctionElement):
+    """
+    Целое число суток от `now` до `moment`, округленное вниз —
+    то же, что (moment - now).days в Python.
+    """
+    type = Integer()
+    inherit_cache = True
+    name = "days_until"
+
+
+@compiles(days_until)
+def _days_until_default(element, compiler, **kw):
+    moment, now = list(element.clauses)
+    return "CAST(FLOOR(EXTRACT(EPOCH FROM (%s - %s)) / 86400) AS INTEGER)" % (
+        compiler.process(moment, **kw),
+        compiler.process(now, **kw),
+    )
+
+
+@compiles(days_until, "sqlite")
+def _days_until_sqlite(element, compiler, **kw):
+    # В SQLite нет FLOOR: CAST отбрасывает дробную часть, для отрицательных вычитаем 1
+    moment, now = list(element.clauses)
+    diff = "(julianday(%s) - julianday(%s))" % (
+        compiler.process(moment, **kw),
+        compiler.process(now, **kw),
+    )
+    return "(CAST(%s AS INTEGER) - (%s < CAST(%s AS INTEGER)))" % (diff, diff, diff)
+
+
+class utc_now(FunctionElement):
+    """
+    Текущее время для отметок изменений. В PostgreSQL — now(); в SQLite CURRENT_TIMESTAMP
+    хранит только секунды, поэтому время берется с микросекундами в формате SQLAlchemy:
+    иначе сравнение строк с водяным знаком теряло бы изменения той же секунды.
+    """
+    type = DateTime(timezone=True)
+    inherit_cache = True
+    name = "utc_now"
+
+
+@compiles(utc_now)
+def _utc_now_default(element, compiler, **kw):
+    return "now()"
+
+
+@compiles(utc_now, "sqlite")
+def _utc_now_sqlite(element, compiler, **kw):
+    return "(STRFTIME('%Y-%m-%d %H:%M:%f', 'now') || '000')"
@@ -0,0 +1,177 @@
+import asyncio
+import os
+from collections import defaultdict
+from typing import Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import select, func, case, delete, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Task, TaskCounter, TaskTombstone, TaskVersion, User
+from read_routing import mark_write
+from task_events import encode_event, queue_task_events, task_events_wanted
+
+load_dotenv()
+
+# Инкрементальные счетчики для /stats (таблица task_counters) включаются явно:
+# после включения их нужно один раз пересчитать — python task_changes.py
+TASK_COUNTERS_ENABLED = os.getenv("TASK_COUNTERS_ENABLED", "false").lower() in ("1", "true", "yes")
+
+QUADRANT_COLUMNS = {"Q1": "q1", "Q2": "q2", "Q3": "q3", "Q4": "q4"}
+
+
+def _dialect_insert(db: AsyncSession):
+    if db.bind.dialect.name == "postgresql":
+        return postgresql.insert
+    return sqlite.insert
+
+
+class TaskChangeSet:
+    """
+    Набор изменений задач в рамках одной транзакции.
+    Обработчики записи сообщают, какие задачи появились/исчезли, а apply()
+    обновляет производные данные (версии для ETag, users.tasks_count, счетчики) до commit
+    и ставит события для подписчиков /tasks/events (они уходят только после commit).
+    Для удаленных задач (событие deleted) пишутся следы для /tasks/changes.
+    """
+
+    def __init__(self):
+        self._deltas = defaultdict(lambda: defaultdict(int))
+        self._touched = set()
+        self._task_counts = defaultdict(int)
+        self._events = []
+
+    def event(self, kind: str, user_id: Optional[int], task_id: Optional[int] = None, task=None) -> None:
+        """kind: created, updated, completed, deleted, imported; task — новое состояние задачи."""
+        self._events.append((kind, user_id, task_id, task))
+
+    def added(self, user_id: Optional[int], quadrant: str, completed: bool) -> None:
+        self._add(user_id, quadrant, completed, 1)
+
+    def removed(self, user_id: Optional[int], quadrant: str, completed: bool) -> None:
+        self._add(user_id, quadrant, completed, -1)
+
+    def changed(
+        self,
+        user_id: Optional[int],
+        old_quadrant: str,
+        old_completed: bool,
+        new_quadrant: str,
+        new_completed: bool
+    ) -> None:
+        self.removed(user_id, old_quadrant, old_completed)
+        self.added(user_id, new_quadrant, new_completed)
+
+    def _add(self, user_id: Optional[int], quadrant: str, completed: bool, sign: int) -> None:
+        if user_id is None:
+            return
+        self._touched.add(user_id)
+        self._task_counts[user_id] += sign
+        delta = self._deltas[user_id]
+        delta[QUADRANT_COLUMNS[quadrant]] += sign
+        if completed:
+            delta["completed"] += sign
+
+    async def apply(self, db: AsyncSession) -> None:
+        await self._bump_versions(db)
+        await self._apply_task_counts(db)
+        await self._write_tombstones(db)
+        await mark_write(db, self._touched)
+        if TASK_COUNTERS_ENABLED:
+            await self._apply_counters(db)
+        if self._events and task_events_wanted(db):
+            await queue_task_events(db, [
+                (user_id, kind, encode_event(kind, user_id, task_id, task))
+                for kind, user_id, task_id, task in self._events
+            ])
+
+    async def _bump_versions(self, db: AsyncSession) -> None:
+        # Версия растет при любом изменении, даже если счетчики не поменялись (например, title).
+        # Один upsert на все затронутые строки; порядок user_id исключает взаимные блокировки
+        if not self._touched:
+            return
+        insert = _dialect_insert(db)
+        stmt = insert(TaskVersion).values([
+            {"user_id": user_id, "version": 1} for user_id in sorted(self._touched)
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[TaskVersion.user_id],
+            set_={"version": TaskVersion.version + 1}
+        )
+        await db.execute(stmt)
+
+    async def _write_tombstones(self, db: AsyncSession) -> None:
+        tombstones = {
+            task_id: user_id for kind, user_id, task_id, _ in self._events if kind == "deleted"
+        }
+        if not tombstones:
+            return
+        insert = _dialect_insert(db)
+        stmt = insert(TaskTombstone).values([
+            {"task_id": task_id, "user_id": user_id} for task_id, user_id in sorted(tombstones.items())
+        ])
+        # id задачи может освободиться и снова удалиться (SQLite переиспользует rowid)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[TaskTombstone.task_id],
+            set_={"user_id": stmt.excluded.user_id, "deleted_at": stmt.excluded.deleted_at}
+        )
+        await db.execute(stmt)
+
+    async def _apply_task_counts(self, db: AsyncSession) -> None:
+        # Один UPDATE на всех затронутых пользователей: tasks_count + CASE id WHEN ... THEN delta
+        counts = {user_id: n for user_id, n in sorted(self._task_counts.items()) if n}
+        if not counts:
+            return
+        await db.execute(
+            update(User)
+            .where(User.id.in_(counts))
+            .values(tasks_count=User.tasks_count + case(counts, value=User.id, else_=0))
+            .execution_options(synchronize_session=False)
+        )
+
+    async def _apply_counters(self, db: AsyncSession) -> None:
+        insert = _dialect_insert(db)
+        for user_id, delta in self._deltas.items():
+            delta = {k: v for k, v in delta.items() if v}
+            if not delta:
+                continue
+            stmt = insert(TaskCounter).values(user_id=user_id, **delta)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[TaskCounter.user_id],
+                set_={k: getattr(TaskCounter, k) + v for k, v in delta.items()}
+            )
+            await db.execute(stmt)
+
+
+async def rebuild_task_counters(db: AsyncSession) -> None:
+    """Полный пересчет task_counters по таблице tasks (после включения или для исправления)."""
+    rows = await db.execute(
+        select(
+            Task.user_id,
+            *[
+                func.count(case((Task.quadrant == q, 1))).label(col)
+                for q, col in QUADRANT_COLUMNS.items()
+            ],
+            func.count(case((Task.completed == True, 1))).label("completed")
+        )
+        .where(Task.user_id.is_not(None))
+        .group_by(Task.user_id)
+    )
+    await db.execute(delete(TaskCounter))
+    values = [row._asdict() for row in rows]
+    if values:
+        await db.execute(_dialect_insert(db)(TaskCounter), values)
+    await db.commit()
+
+
+if __name__ == "__main__":
+    from database import AsyncSessionLocal, engine
+
+    async def main():
+        async with AsyncSessionLocal() as session:
+            await rebuild_task_counters(session)
+        await engine.dispose()
+        print("Счетчики задач пересчитаны!")
+
+    asyncio.run(main())
@@ -0,0 +1,239 @@
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+from uuid import uuid4
+
+import orjson
+from dotenv import load_dotenv
+from sqlalchemy import event, select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from models import User, UserRole
+from pg_listener import pg_listener
+from serialization import task_to_dict
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+TASK_EVENTS_ENABLED = os.getenv("TASK_EVENTS_ENABLED", "true").lower() in ("1", "true", "yes")
+# Рассылка событий другим воркерам через PostgreSQL LISTEN/NOTIFY — только явно: каждая запись
+# задач тогда делает pg_notify, а commit с NOTIFY берет общую для всей БД блокировку очереди уведомлений
+TASK_EVENTS_PG_FANOUT = os.getenv("TASK_EVENTS_PG_FANOUT", "false").lower() in ("1", "true", "yes")
+# Одновременных подписок на один воркер
+TASK_EVENTS_MAX_CONNECTIONS = int(os.getenv("TASK_EVENTS_MAX_CONNECTIONS", "500"))
+# Неотправленных событий на подписку; медленный клиент при переполнении получает resync и отключается
+TASK_EVENTS_QUEUE_SIZE = int(os.getenv("TASK_EVENTS_QUEUE_SIZE", "100"))
+TASK_EVENTS_HEARTBEAT_SECONDS = float(os.getenv("TASK_EVENTS_HEARTBEAT_SECONDS", "15"))
+TASK_EVENTS_CHANNEL = "task_events"
+
+# Лимит NOTIFY в PostgreSQL — 8000 байт; события делятся на несколько уведомлений
+NOTIFY_MAX_BYTES = 7900
+# Уведомления своего воркера уже доставлены локально после commit
+WORKER_ID = uuid4().hex
+
+_CLOSE = object()
+_RESYNC = b"event: resync\ndata: {}\n\n"
+
+
+class Subscription:
+    __slots__ = ("user_id", "queue", "overflowed")
+
+    def __init__(self, user_id: Optional[int], queue_size: int):
+        # None — ADMIN, получает события всех пользователей
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def offer(self, message: bytes) -> bool:
+        if self.overflowed:
+            return False
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Клиент не успевает читать: накопленное выбрасываем и просим его пересинхронизироваться
+            self.overflowed = True
+            self._replace_backlog(_RESYNC)
+            logger.warning("SSE: очередь подписки (user_id=%s) переполнена, клиент получит resync и будет отключен", self.user_id)
+            return False
+        return True
+
+    def _replace_backlog(self, message) -> None:
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+
+class TaskEventBroker:
+    """
+    Pub/sub событий задач внутри воркера: события пользователя получают его подписки
+    и подписки администраторов. Очередь подписки ограничена, число подписок — тоже.
+    Рассчитан на использование из одного event loop, поэтому без блокировок.
+    """
+
+    def __init__(self, max_connections: int, queue_size: int):
+        self.max_connections = max_connections
+        self.queue_size = queue_size
+        self._subscribers: Dict[Optional[int], Set[Subscription]] = defaultdict(set)
+        self.connections = 0
+        self.published = 0
+        self.delivered = 0
+        self.overflows = 0
+        self.rejected = 0
+
+    def subscribe(self, user: User) -> Optional[Subscription]:
+        """Новая подписка или None, если лимит подключений воркера исчерпан."""
+        if self.connections >= self.max_connections:
+            self.rejected += 1
+            return None
+        user_id = None if user.role == UserRole.ADMIN else user.id
+        subscription = Subscription(user_id, self.queue_size)
+        self._subscribers[user_id].add(subscription)
+        self.connections += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscribers = self._subscribers.get(subscription.user_id)
+        if subscribers is None or subscription not in subscribers:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[subscription.user_id]
+        self.connections -= 1
+
+    def publish(self, events: List[Tuple[Optional[int], str, bytes]]) -> None:
+        """events: [(user_id, тип, JSON события)]; сообщение SSE собирается один раз на событие."""
+        for user_id, kind, data in events:
+            self.published += 1
+            targets = self._subscribers.get(user_id, ())
+            admins = self._subscribers.get(None, ()) if user_id is not None else ()
+            if not targets and not admins:
+                continue
+            message = b"event: " + kind.encode() + b"\ndata: " + data + b"\n\n"
+            for subscription in (*targets, *admins):
+                overflowed = subscription.overflowed
+                if subscription.offer(message):
+                    self.delivered += 1
+                elif not overflowed:
+                    self.overflows += 1
+
+    def close(self) -> None:
+        """Завершает все потоки (остановка воркера)."""
+        if self.connections:
+            logger.info("SSE: закрытие %s подписок при остановке воркера", self.connections)
+        for subscribers in self._subscribers.values():
+            for subscription in subscribers:
+                subscription.overflowed = True
+                subscription._replace_backlog(_CLOSE)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": TASK_EVENTS_ENABLED,
+            "connections": self.connections,
+            "max_connections": self.max_connections,
+            "queue_size": self.queue_size,
+            "published": self.published,
+            "delivered": self.delivered,
+            "overflows": self.overflows,
+            "rejected": self.rejected,
+        }
+
+
+task_event_broker = TaskEventBroker(TASK_EVENTS_MAX_CONNECTIONS, TASK_EVENTS_QUEUE_SIZE)
+
+
+def encode_event(kind: str, user_id: Optional[int], task_id: Optional[int], task=None) -> bytes:
+    """JSON события; task (ORM-объект или строка) — в формате TaskResponse, для удаления — null."""
+    payload = {
+        "type": kind,
+        "id": task_id,
+        "user_id": user_id,
+        "task": task_to_dict(task, datetime.now(timezone.utc)) if task is not None else None,
+    }
+    return orjson.dumps(payload, option=orjson.OPT_UTC_Z)
+
+
+def _notify_payloads(events: List[Tuple[Optional[int], str, bytes]]) -> List[str]:
+    head = b'{"origin":"' + WORKER_ID.encode() + b'","events":['
+    payloads, chunk, size = [], [], len(head) + 2
+    for _, _, data in events:
+        if size + len(data) + 1 > NOTIFY_MAX_BYTES and chunk:
+            payloads.append(head + b",".join(chunk) + b"]}")
+            chunk, size = [], len(head) + 2
+        chunk.append(data)
+        size += len(data) + 1
+    if chunk:
+        payloads.append(head + b",".join(chunk) + b"]}")
+    return [p.decode() for p in payloads]
+
+
+def _fanout(db: AsyncSession) -> bool:
+    return TASK_EVENTS_PG_FANOUT and db.bind.dialect.name == "postgresql"
+
+
+def task_events_wanted(db: AsyncSession) -> bool:
+    """Нужно ли вообще собирать события: без рассылки и без подписчиков их некому отдать."""
+    return TASK_EVENTS_ENABLED and (task_event_broker.connections > 0 or _fanout(db))
+
+
+async def queue_task_events(db: AsyncSession, events: List[Tuple[Optional[int], str, bytes]]) -> None:
+    """
+    Ставит события в очередь транзакции: подписчики этого воркера получат их после commit,
+    другие воркеры — через NOTIFY (тоже только после commit). При rollback события отбрасываются.
+    """
+    if not TASK_EVENTS_ENABLED or not events:
+        return
+    db.sync_session.info.setdefault("task_events", []).extend(events)
+    if _fanout(db):
+        # Все уведомления одним запросом
+        await db.execute(select(*[
+            func.pg_notify(TASK_EVENTS_CHANNEL, payload) for payload in _notify_payloads(events)
+        ]))
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_after_commit(session: Session) -> None:
+    events = session.info.pop("task_events", None)
+    if events:
+        task_event_broker.publish(events)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_after_rollback(session: Session, previous_transaction) -> None:
+    session.info.pop("task_events", None)
+
+
+def _on_notify(payload: str) -> None:
+    message = orjson.loads(payload)
+    if message["origin"] == WORKER_ID:
+        return
+    task_event_broker.publish([
+        (e["user_id"], e["type"], orjson.dumps(e)) for e in message["events"]
+    ])
+
+
+if TASK_EVENTS_ENABLED and TASK_EVENTS_PG_FANOUT:
+    pg_listener.subscribe(TASK_EVENTS_CHANNEL, _on_notify)
+
+
+async def event_stream(subscription: Subscription) -> AsyncIterator[bytes]:
+    """Поток SSE: события, комментарии-heartbeat, resync при переполнении очереди."""
+    try:
+        yield b"retry: 5000\n\n"
+        while True:
+            try:
+                message = await asyncio.wait_for(subscription.queue.get(), TASK_EVENTS_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield b": ping\n\n"
+                continue
+            if message is _CLOSE:
+                return
+            yield message
+            if message is _RESYNC:
+                return
+    finally:
+        task_event_broker.unsubscribe(subscription)
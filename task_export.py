@@ -0,0 +1,77 @@
+import csv
+import io
+from typing import AsyncIterator, Optional
+
+import orjson
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from database import AsyncSessionLocal
+from models import Task
+
+EXPORT_COLUMNS = (
+    Task.id,
+    Task.user_id,
+    Task.title,
+    Task.description,
+    Task.is_important,
+    Task.deadline_at,
+    Task.quadrant,
+    Task.completed,
+    Task.created_at,
+    Task.completed_at,
+)
+EXPORT_FIELDS = [c.key for c in EXPORT_COLUMNS]
+EXPORT_BATCH_SIZE = 1000
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def _ndjson_chunk(rows) -> bytes:
+    return b"".join(
+        orjson.dumps(row._asdict(), option=orjson.OPT_UTC_Z | orjson.OPT_APPEND_NEWLINE)
+        for row in rows
+    )
+
+
+def _csv_value(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+def _csv_chunk(rows, header: bool = False) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        writer.writerow([_csv_value(value) for value in row])
+    return buffer.getvalue().encode("utf-8")
+
+
+async def export_tasks(
+    fmt: str,
+    user_id: Optional[int],
+    session_factory: async_sessionmaker = AsyncSessionLocal
+) -> AsyncIterator[bytes]:
+    """
+    Построчная выгрузка задач через серверный курсор (stream + yield_per): в памяти
+    одновременно только одна пачка строк, первые байты уходят до окончания запроса.
+    Сессия открывается внутри генератора и живет, пока идет ответ.
+    """
+    stmt = select(*EXPORT_COLUMNS).order_by(Task.id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+    if user_id is not None:
+        stmt = stmt.where(Task.user_id == user_id)
+
+    if fmt == "csv":
+        yield _csv_chunk([], header=True)
+    async with session_factory() as session:
+        result = await session.stream(stmt)
+        async for rows in result.partitions():
+            yield _csv_chunk(rows) if fmt == "csv" else _ndjson_chunk(rows)
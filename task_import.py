@@ -0,0 +1,218 @@
+import csv
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Any, Callable, IO, Iterator, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Task
+from schemas import TaskCreate, validation_detail
+from task_changes import TaskChangeSet
+from task_quadrants import calculate_quadrant
+
+logger = logging.getLogger(__name__)
+
+IMPORT_CHUNK_SIZE = 5000
+MAX_REPORTED_REJECTS = 1000
+
+# Порядок колонок для COPY; created_at заполняет server_default
+COPY_COLUMNS = ["title", "description", "is_important", "deadline_at", "user_id", "quadrant", "completed"]
+
+
+class ImportReport:
+    def __init__(self):
+        self.accepted = 0
+        self.rejected = 0
+        self.chunks = 0
+        self.rejects: List[dict] = []
+
+    def reject(self, line: int, detail: Any) -> None:
+        self.rejected += 1
+        if len(self.rejects) < MAX_REPORTED_REJECTS:
+            self.rejects.append({"line": line, "detail": detail})
+
+    def as_dict(self) -> dict:
+        return {
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "chunks": self.chunks,
+            "rejects": self.rejects,
+            "rejects_truncated": self.rejected > len(self.rejects),
+        }
+
+
+def _decode_lines(stream: IO[bytes]) -> Iterator[Tuple[int, Any]]:
+    """(номер строки, текст) по строкам потока; строка не в UTF-8 — UnicodeDecodeError вместо текста."""
+    for line_no, line in enumerate(stream, start=1):
+        try:
+            yield line_no, line.decode("utf-8")
+        except UnicodeDecodeError as e:
+            yield line_no, e
+
+
+def _iter_raw(stream: IO[bytes], fmt: str) -> Iterator[Tuple[int, Any]]:
+    """(номер строки, сырой объект) из потока NDJSON или CSV с заголовком."""
+    # Строки декодируются по одной: неверная кодировка отклоняет строку, а не весь импорт
+    lines = _decode_lines(stream)
+    if fmt == "csv":
+        bad_lines: List[Tuple[int, UnicodeDecodeError]] = []
+        last_line = 0
+
+        def valid_lines() -> Iterator[str]:
+            nonlocal last_line
+            for line_no, line in lines:
+                last_line = line_no
+                if isinstance(line, UnicodeDecodeError):
+                    bad_lines.append((line_no, line))
+                    continue
+                yield line
+
+        for record in csv.DictReader(valid_lines()):
+            yield from bad_lines
+            bad_lines.clear()
+            # Пустая ячейка CSV — отсутствующее значение
+            yield last_line, {k: (v if v != "" else None) for k, v in record.items()}
+        yield from bad_lines
+        return
+    for line_no, line in lines:
+        if isinstance(line, UnicodeDecodeError):
+            yield line_no, line
+            continue
+        if not line.strip():
+            continue
+        try:
+            yield line_no, json.loads(line)
+        except ValueError as e:
+            yield line_no, e
+
+
+def _iter_chunks(
+    stream: IO[bytes],
+    fmt: str,
+    user_id: int,
+    chunk_size: int,
+    report: ImportReport
+) -> Iterator[List[tuple]]:
+    """
+    Валидирует строки по TaskCreate и собирает пачки записей для COPY.
+    Квадранты считаются для всей пачки относительно одного момента.
+    """
+    chunk: List[tuple] = []
+    now = datetime.now(timezone.utc)
+    for line_no, raw in _iter_raw(stream, fmt):
+        if isinstance(raw, UnicodeDecodeError):
+            report.reject(line_no, f"Некорректная кодировка (ожидается UTF-8): {raw}")
+            continue
+        if isinstance(raw, ValueError):
+            report.reject(line_no, f"Некорректный JSON: {raw}")
+            continue
+        try:
+            task = TaskCreate.model_validate(raw)
+        except ValidationError as e:
+            report.reject(line_no, validation_detail(e))
+            continue
+        deadline_at = task.deadline_at
+        if deadline_at.tzinfo is None:
+            deadline_at = deadline_at.replace(tzinfo=timezone.utc)
+        chunk.append((
+            task.title,
+            task.description,
+            task.is_important,
+            deadline_at,
+            user_id,
+            calculate_quadrant(task.is_important, deadline_at, now),
+            False,
+        ))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+            now = datetime.now(timezone.utc)
+    if chunk:
+        yield chunk
+
+
+async def _copy_chunk(db: AsyncSession, records: List[tuple]) -> None:
+    conn = await db.connection()
+    if conn.dialect.driver == "asyncpg":
+        # COPY через asyncpg в той же транзакции, что и сессия
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            Task.__tablename__,
+            records=records,
+            columns=COPY_COLUMNS
+        )
+    else:
+        await db.execute(insert(Task), [dict(zip(COPY_COLUMNS, r)) for r in records])
+
+
+async def import_tasks(
+    db: AsyncSession,
+    stream: IO[bytes],
+    fmt: str,
+    user_id: int,
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+    progress: Optional[Callable[[ImportReport], None]] = None
+) -> ImportReport:
+    """
+    Загружает задачи из NDJSON/CSV пачками по chunk_size: разбор и валидация идут
+    в пуле потоков, загрузка — COPY, каждая пачка фиксируется отдельной транзакцией.
+    """
+    report = ImportReport()
+    chunks = _iter_chunks(stream, fmt, user_id, chunk_size, report)
+    # Транзакция, открытая проверкой пользователя, не должна оставаться открытой, пока
+    # валидируется пачка: отметки изменений в PostgreSQL — время начала транзакции
+    if db.in_transaction():
+        await db.commit()
+    while True:
+        records = await run_in_threadpool(next, chunks, None)
+        if records is None:
+            break
+        await _copy_chunk(db, records)
+        changes = TaskChangeSet()
+        for record in records:
+            changes.added(user_id, record[5], False)
+        # Одно событие на пачку: подписчик перечитывает список, а не получает тысячи событий
+        changes.event("imported", user_id)
+        await changes.apply(db)
+        await db.commit()
+
+        report.accepted += len(records)
+        report.chunks += 1
+        logger.info("Импорт задач: принято %s, отклонено %s", report.accepted, report.rejected)
+        if progress is not None:
+            progress(report)
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+    import asyncio
+    import os
+
+    from database import AsyncSessionLocal, engine
+
+    parser = argparse.ArgumentParser(description="Импорт задач из NDJSON или CSV")
+    parser.add_argument("path", help="файл .ndjson/.jsonl или .csv")
+    parser.add_argument("--user-id", type=int, required=True, help="владелец задач")
+    parser.add_argument("--format", choices=["ndjson", "csv"], help="по умолчанию — по расширению файла")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+    fmt = args.format or ("csv" if os.path.splitext(args.path)[1].lower() == ".csv" else "ndjson")
+
+    def print_progress(report: ImportReport) -> None:
+        print(f"Принято: {report.accepted}, отклонено: {report.rejected}", flush=True)
+
+    async def main():
+        with open(args.path, "rb") as stream:
+            async with AsyncSessionLocal() as session:
+                report = await import_tasks(session, stream, fmt, args.user_id, args.chunk_size, print_progress)
+        await engine.dispose()
+        for reject in report.rejects:
+            print(f"Строка {reject['line']}: {reject['detail']}")
+        print(f"Импорт завершен: принято {report.accepted}, отклонено {report.rejected}")
+
+    asyncio.run(main())
@@ -0,0 +1,69 @@
+from datetime import datetime, timezone, timedelta
+from typing import Optional
+
+from sqlalchemy import and_, case
+
+from models import Task
+
+# Задача срочная, если до дедлайна осталось не больше URGENCY_WINDOW.
+# Сохраненный квадрант освежает фоновая задача jobs.quadrants
+URGENCY_WINDOW = timedelta(days=3)
+
+
+def calculate_quadrant(
+    is_important: bool,
+    deadline_at: datetime,
+    now: Optional[datetime] = None
+) -> str:
+    # now передается снаружи, чтобы пакет задач считался относительно одного момента
+    if now is None:
+        now = datetime.now(timezone.utc)
+    if deadline_at.tzinfo is None:
+        deadline_at = deadline_at.replace(tzinfo=timezone.utc)
+    
+    # Срочно, если до дедлайна <= 3 дней
+    is_urgent = (deadline_at - now) <= URGENCY_WINDOW
+    
+    if is_important and is_urgent:
+        return "Q1"
+    elif is_important and not is_urgent:
+        return "Q2"
+    elif not is_important and is_urgent:
+        return "Q3"
+    else:
+        return "Q4"
+
+
+def quadrant_expression(
+    is_important: Optional[bool],
+    deadline_at: Optional[datetime]
+):
+    """
+    Квадрант для UPDATE, когда известна только часть входных данных: None означает
+    «взять текущее значение из строки». Если известно все, считается в Python.
+    """
+    now = datetime.now(timezone.utc)
+    if is_important is not None and deadline_at is not None:
+        return calculate_quadrant(is_important, deadline_at, now)
+    if deadline_at is not None:
+        is_urgent = calculate_quadrant(True, deadline_at, now) == "Q1"
+        return case(
+            (Task.is_important, "Q1" if is_urgent else "Q2"),
+            else_="Q3" if is_urgent else "Q4"
+        )
+    is_urgent = Task.deadline_at <= now + URGENCY_WINDOW
+    return case(
+        (is_urgent, "Q1" if is_important else "Q3"),
+        else_="Q2" if is_important else "Q4"
+    )
+
+
+def quadrant_case(is_important, deadline_at, now: datetime):
+    """Квадрант SQL-выражением, когда важность и дедлайн — выражения (например, из VALUES пакета)."""
+    is_urgent = deadline_at <= now + URGENCY_WINDOW
+    return case(
+        (and_(is_important, is_urgent), "Q1"),
+        (is_important, "Q2"),
+        (is_urgent, "Q3"),
+        else_="Q4"
+    )
@@ -0,0 +1,116 @@
+from typing import Optional
+
+from sqlalchemy import select, func, or_, tuple_, Float, literal_column
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Task
+from models.task import SEARCH_CONFIG, search_document
+from pagination import decode_cursor, encode_cursor
+
+# Ключ курсора поиска: (релевантность, id), обе части по убыванию
+RANK_KEY = (literal_column("rank", Float), Task.id)
+
+
+def _like_pattern(q: str) -> str:
+    escaped = q.replace("/", "//").replace("%", "/%").replace("_", "/_")
+    return f"%{escaped}%"
+
+
+async def search_task_page(
+    db: AsyncSession,
+    q: str,
+    user_id: Optional[int],
+    cursor: Optional[str],
+    limit: int
+) -> dict:
+    """
+    Поиск задач с ранжированием по релевантности и keyset-пагинацией по (rank, id).
+    user_id=None — поиск по всем задачам (ADMIN).
+    """
+    if db.bind.dialect.name == "postgresql":
+        return await _search_postgresql(db, q, user_id, cursor, limit)
+    return await _search_python(db, q, user_id, cursor, limit)
+
+
+async def _search_postgresql(db, q, user_id, cursor, limit) -> dict:
+    # Полнотекстовое совпадение обслуживает GIN по tsvector, подстроку — триграммные индексы
+    query = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+    document = search_document(Task.title, Task.description)
+    pattern = _like_pattern(q)
+    rank = (
+        func.ts_rank(document, query)
+        + func.similarity(Task.title, q)
+        + func.coalesce(func.similarity(Task.description, q), 0)
+    ).cast(Float)
+
+    stmt = select(Task, rank.label("rank")).where(or_(
+        document.op("@@")(query),
+        Task.title.ilike(pattern, escape="/"),
+        Task.description.ilike(pattern, escape="/")
+    ))
+    if user_id is not None:
+        stmt = stmt.where(Task.user_id == user_id)
+    if cursor is not None:
+        last_rank, last_id = decode_cursor(cursor, RANK_KEY)
+        stmt = stmt.where(tuple_(rank, Task.id) < tuple_(last_rank, last_id))
+    stmt = stmt.order_by(rank.desc(), Task.id.desc()).limit(limit + 1)
+
+    rows = (await db.execute(stmt)).all()
+    return _build_page([(row.Task, row.rank) for row in rows], limit)
+
+
+def _score(q: str, title: str, description: Optional[str]) -> float:
+    """Упрощенный аналог ts_rank + similarity: доля совпавших слов плюс бонус за подстроку."""
+    needle = q.casefold()
+    title = title.casefold()
+    text = f"{title} {(description or '').casefold()}"
+    terms = needle.split()
+    if not terms:
+        return 0.0
+    if needle not in text and not all(term in text for term in terms):
+        return 0.0
+    words = text.split()
+    if not words:
+        # Название и описание из одних пробелов
+        return 0.0
+    matched = sum(1 for word in words if any(term in word for term in terms))
+    score = matched / len(words)
+    if needle in title:
+        score += 1.0
+    elif needle in text:
+        score += 0.5
+    return round(score, 6)
+
+
+async def _search_python(db, q, user_id, cursor, limit) -> dict:
+    # Фолбэк для SQLite и других СУБД без tsvector/pg_trgm: ранжируем в Python
+    stmt = select(Task.id, Task.title, Task.description)
+    if user_id is not None:
+        stmt = stmt.where(Task.user_id == user_id)
+    scored = []
+    for row in await db.execute(stmt):
+        score = _score(q, row.title, row.description)
+        if score > 0:
+            scored.append((score, row.id))
+    scored.sort(reverse=True)
+
+    if cursor is not None:
+        last = tuple(decode_cursor(cursor, RANK_KEY))
+        scored = [key for key in scored if key < last]
+    scored = scored[:limit + 1]
+
+    ids = [task_id for _, task_id in scored]
+    tasks = {}
+    if ids:
+        result = await db.execute(select(Task).where(Task.id.in_(ids)))
+        tasks = {task.id: task for task in result.scalars()}
+    return _build_page([(tasks[task_id], score) for score, task_id in scored if task_id in tasks], limit)
+
+
+def _build_page(ranked: list, limit: int) -> dict:
+    items = [task for task, _ in ranked[:limit]]
+    next_cursor = None
+    if len(ranked) > limit:
+        task, rank = ranked[limit - 1]
+        next_cursor = encode_cursor([rank, task.id])
+    return {"items": items, "next_cursor": next_cursor}
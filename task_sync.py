@@ -0,0 +1,130 @@
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+from fastapi import HTTPException, status
+from sqlalchemy import event, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import engine
+from models import Task, TaskTombstone
+from pagination import paginate, encode_cursor, decode_cursor
+from serialization import TASK_RESPONSE_COLUMNS
+from sql_functions import utc_now
+
+load_dotenv()
+
+# Горизонт синхронизации — время БД минус столько секунд, но не позже начала самой старой
+# незавершенной транзакции: ее строки получат отметку не новее ее начала, а видны станут только
+# после commit. Задержка покрывает только гонку между чтением горизонта и началом новых транзакций
+SYNC_WATERMARK_LAG_SECONDS = float(os.getenv("SYNC_WATERMARK_LAG_SECONDS", "2"))
+# Сколько хранятся следы удаленных задач; более старый водяной знак требует полной синхронизации
+SYNC_TOMBSTONE_RETENTION_SECONDS = float(os.getenv("SYNC_TOMBSTONE_RETENTION_SECONDS", str(30 * 24 * 3600)))
+
+TASK_CHANGE_KEY = (Task.updated_at, Task.id)
+TOMBSTONE_KEY = (TaskTombstone.deleted_at, TaskTombstone.task_id)
+
+
+def _utc(value: datetime) -> datetime:
+    # SQLite возвращает время без часового пояса (UTC)
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+
+# Незавершенные пишущие транзакции процесса (SQLite): соединение -> время первой записи.
+# В SQLite отметка ставится в момент записи, а не в начале транзакции
+_open_writes: Dict[int, datetime] = {}
+
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _track_write(conn, cursor, statement, parameters, context, executemany):
+        if context is not None and (context.isinsert or context.isupdate or context.isdelete):
+            # utc_now() в SQLite точен до миллисекунд — округляем вниз так же
+            started = datetime.now(timezone.utc)
+            _open_writes.setdefault(id(conn), started.replace(microsecond=started.microsecond // 1000 * 1000))
+
+    @event.listens_for(engine.sync_engine, "commit")
+    @event.listens_for(engine.sync_engine, "rollback")
+    def _end_write(conn):
+        _open_writes.pop(id(conn), None)
+
+
+# Начало самой старой транзакции в этой БД, кроме своей. Учитываются и транзакции, которые
+# пока только читали: отметка now() у строк, записанных ими позже, — все равно время начала.
+# Роли приложения должны быть видны чужие сеансы (та же роль или pg_read_all_stats)
+OLDEST_TRANSACTION_SQL = text(
+    "SELECT min(xact_start) FROM pg_stat_activity "
+    "WHERE datname = current_database() AND pid <> pg_backend_pid() AND xact_start IS NOT NULL"
+)
+
+
+async def _oldest_open_transaction(db: AsyncSession) -> Optional[datetime]:
+    if db.bind.dialect.name == "postgresql":
+        started = await db.scalar(OLDEST_TRANSACTION_SQL)
+    else:
+        started = min(_open_writes.values(), default=None)
+    return _utc(started) if started is not None else None
+
+
+async def fetch_changes(
+    db: AsyncSession,
+    user_id: Optional[int],
+    since: Optional[str],
+    limit: int
+) -> dict:
+    """
+    Задачи, измененные после водяного знака, и id удаленных — в порядке (время изменения, id).
+    Два индексных запроса (tasks и task_tombstones) по limit + 1 строк сливаются в один поток;
+    оба ограничены горизонтом, поэтому любой водяной знак (и на промежуточной странице) не новее него.
+    since=None — первая синхронизация: все задачи, без удалений.
+    """
+    # Время берется из БД, а не с сервера приложения: отметки изменений ставит БД,
+    # и расхождение часов не должно сдвигать горизонт мимо строк
+    db_now = _utc(await db.scalar(select(utc_now())))
+    horizon = db_now - timedelta(seconds=SYNC_WATERMARK_LAG_SECONDS)
+    oldest = await _oldest_open_transaction(db)
+    if oldest is not None and oldest < horizon:
+        # Долгая транзакция (ожидание блокировок, большой пакет, импорт) еще может зафиксировать
+        # строки с более ранней отметкой: водяной знак не должен их обогнать
+        horizon = oldest - timedelta(microseconds=1)
+    since_key = None
+    if since is not None:
+        since_at, since_id = decode_cursor(since, TASK_CHANGE_KEY)
+        since_key = (_utc(since_at), since_id)
+        if since_key[0] < db_now - timedelta(seconds=SYNC_TOMBSTONE_RETENTION_SECONDS):
+            raise HTTPException(
+                status_code=status.HTTP_410_GONE,
+                detail="Водяной знак устарел, выполните полную синхронизацию (без since)"
+            )
+
+    stmt = select(*TASK_RESPONSE_COLUMNS, Task.updated_at).where(Task.updated_at <= horizon)
+    if user_id is not None:
+        stmt = stmt.where(Task.user_id == user_id)
+    changes = [
+        (_utc(row.updated_at), row.id, row)
+        for row in await db.execute(paginate(stmt, TASK_CHANGE_KEY, since, limit))
+    ]
+    if since is not None:
+        stmt = select(TaskTombstone.task_id, TaskTombstone.deleted_at).where(TaskTombstone.deleted_at <= horizon)
+        if user_id is not None:
+            stmt = stmt.where(TaskTombstone.user_id == user_id)
+        changes += [
+            (_utc(row.deleted_at), row.task_id, None)
+            for row in await db.execute(paginate(stmt, TOMBSTONE_KEY, since, limit))
+        ]
+    changes.sort(key=lambda change: change[:2])
+
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    items = [row for _, _, row in changes if row is not None]
+    deleted = [task_id for _, task_id, row in changes if row is None]
+
+    if has_more:
+        # Следующая страница начнется сразу после последнего отданного изменения (оно не новее горизонта)
+        position = changes[-1][:2]
+    else:
+        # Все изменения до горизонта отданы
+        position = (horizon, 0)
+    if since_key is not None:
+        position = max(position, since_key)
+    return {"items": items, "deleted": deleted, "watermark": encode_cursor(position), "has_more": has_more}
@@ -0,0 +1,8 @@
+import os
+import sys
+import tempfile
+
+# Тесты идут на временной SQLite-базе; переменные задаются до импорта модулей приложения
+os.environ["DATABASE_URL"] = "sqlite+aiosqlite:///" + os.path.join(tempfile.mkdtemp(), "test.sqlite")
+os.environ.setdefault("DB_POOL_WARMUP", "0")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
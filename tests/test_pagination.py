@@ -0,0 +1,41 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, insert, select
+
+from database import AsyncSessionLocal, engine
+from migrations import migrate
+from models import Task
+from pagination import build_page, paginate
+
+CREATED_KEY = (Task.created_at, Task.id)
+
+
+async def _scenario():
+    await migrate()
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(Task))
+        # Одна пачка — все задачи создаются в одну и ту же секунду
+        deadline = datetime.now(timezone.utc) + timedelta(days=30)
+        await db.execute(insert(Task), [
+            {"title": f"task{i}", "deadline_at": deadline, "quadrant": "Q2"} for i in range(10)
+        ])
+        await db.commit()
+
+        expected = list(await db.scalars(select(Task.id).order_by(Task.created_at, Task.id)))
+        seen, cursor = [], None
+        while True:
+            rows = (await db.execute(paginate(select(Task.id, Task.created_at), CREATED_KEY, cursor, 3))).all()
+            page = build_page(rows, ["created_at", "id"], 3)
+            seen += [row.id for row in page["items"]]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+    await engine.dispose()
+    return seen, expected
+
+
+def test_pages_keep_tasks_created_in_the_same_second():
+    seen, expected = asyncio.run(_scenario())
+    assert len(expected) == 10
+    assert seen == expected
@@ -0,0 +1,102 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import delete, insert, select
+
+import task_sync
+from database import AsyncSessionLocal, engine
+from migrations import migrate
+from models import Task
+from pagination import decode_cursor
+from sql_functions import utc_now
+
+
+async def _insert_task(db, title: str, updated_at=None) -> int:
+    # updated_at=None — отметка по умолчанию, как при обычной записи
+    values = dict(title=title, deadline_at=datetime.now(timezone.utc) + timedelta(days=30), quadrant="Q2")
+    if updated_at is not None:
+        values["updated_at"] = updated_at
+    return await db.scalar(insert(Task).values(**values).returning(Task.id))
+
+
+async def _sync(since, limit):
+    async with AsyncSessionLocal() as db:
+        return await task_sync.fetch_changes(db, None, since, limit)
+
+
+async def _scenario():
+    await migrate()
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(Task))
+        db_now = task_sync._utc(await db.scalar(select(utc_now())))
+        old_ids = [await _insert_task(db, f"old{i}", db_now - timedelta(seconds=60, milliseconds=-i)) for i in range(5)]
+        # Изменение внутри окна задержки — еще не должно попасть в ответ
+        fresh_id = await _insert_task(db, "fresh", db_now)
+        await db.commit()
+
+    seen, since, pages = [], None, 0
+    while True:
+        page = await _sync(since, limit=2)
+        pages += 1
+        seen += [row.id for row in page["items"]]
+        since = page["watermark"]
+        watermark_at, _ = decode_cursor(since, task_sync.TASK_CHANGE_KEY)
+        # Водяной знак любой страницы не новее горизонта (и тем более — свежего изменения)
+        assert task_sync._utc(watermark_at) < db_now
+        if not page["has_more"]:
+            break
+    assert pages == 3
+    assert seen == old_ids
+
+    # Транзакция, начатая раньше, фиксируется позже: ее отметка раньше свежего изменения
+    async with AsyncSessionLocal() as db:
+        late_id = await _insert_task(db, "late", db_now - timedelta(seconds=1))
+        await db.commit()
+
+    task_sync.SYNC_WATERMARK_LAG_SECONDS = 0
+    page = await _sync(since, limit=10)
+    assert [row.id for row in page["items"]] == [late_id, fresh_id]
+    assert not page["has_more"]
+    await engine.dispose()
+
+
+def test_has_more_watermark_never_passes_horizon(monkeypatch):
+    monkeypatch.setattr(task_sync, "SYNC_WATERMARK_LAG_SECONDS", 5)
+    asyncio.run(_scenario())
+
+
+async def _long_writer_scenario():
+    await migrate()
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(Task))
+        await db.commit()
+
+    async with AsyncSessionLocal() as db:
+        done_id = await _insert_task(db, "done")
+        await db.commit()
+
+    writer = AsyncSessionLocal()
+    try:
+        # Пишущая транзакция остается открытой дольше задержки водяного знака
+        slow_id = await _insert_task(writer, "slow")
+        slow_at = task_sync._utc(await writer.scalar(select(Task.updated_at).where(Task.id == slow_id)))
+        await asyncio.sleep(0.05)
+
+        page = await _sync(None, limit=10)
+        assert [row.id for row in page["items"]] == [done_id]
+        since = page["watermark"]
+        watermark_at, _ = decode_cursor(since, task_sync.TASK_CHANGE_KEY)
+        assert task_sync._utc(watermark_at) < slow_at
+        await writer.commit()
+    finally:
+        await writer.close()
+
+    page = await _sync(since, limit=10)
+    assert [row.id for row in page["items"]] == [slow_id]
+    await engine.dispose()
+
+
+def test_watermark_waits_for_open_write_transaction(monkeypatch):
+    monkeypatch.setattr(task_sync, "SYNC_WATERMARK_LAG_SECONDS", 0)
+    asyncio.run(_long_writer_scenario())
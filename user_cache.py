@@ -0,0 +1,44 @@
+import os
+from typing import Optional
+
+from dotenv import load_dotenv
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from cache import TTLCache
+from pg_listener import pg_listener, notify
+
+load_dotenv()
+
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+USER_CACHE_MAX_SIZE = int(os.getenv("USER_CACHE_MAX_SIZE", "10000"))
+USER_CACHE_CHANNEL = "user_cache_invalidate"
+
+# user_id -> {"id", "nickname", "email", "role"} (без хеша пароля)
+user_cache = TTLCache(maxsize=USER_CACHE_MAX_SIZE, ttl=USER_CACHE_TTL_SECONDS)
+
+
+def _on_invalidate(payload: str) -> None:
+    user_cache.pop(int(payload))
+
+
+pg_listener.subscribe(USER_CACHE_CHANNEL, _on_invalidate)
+# Сбросы, разосланные пока не было соединения LISTEN, потеряны — кеш начинаем заново
+pg_listener.on_reconnect(user_cache.clear)
+
+
+def get_cached_user(user_id: int) -> Optional[dict]:
+    return user_cache.get(user_id)
+
+
+def cache_user(user: dict) -> None:
+    user_cache.set(user["id"], user)
+
+
+async def invalidate_user(db: AsyncSession, user_id: int) -> None:
+    """
+    Сбрасывает пользователя из кеша этого воркера и рассылает сброс остальным
+    (через NOTIFY, доставляется после commit). Вызывать при любом изменении кешируемых полей
+    или пароля; сейчас API меняет только пароль.
+    """
+    user_cache.pop(user_id)
+    await notify(db, USER_CACHE_CHANNEL, str(user_id))